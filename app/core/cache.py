@@ -0,0 +1,47 @@
+import time
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Simple in-process cache with per-entry expiry.
+
+    clear() bumps `version`. A caller that reads `version` before computing a
+    value and passes it to set() will not store a result computed from data
+    that was invalidated in the meantime. Each worker process keeps its own copy.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = 0
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, version: int | None = None) -> None:
+        if version is not None and version != self.version:
+            return
+        if key not in self._data and len(self._data) >= self.maxsize:
+            self._evict()
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._data.clear()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+        # Still full - drop the oldest entries
+        while len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
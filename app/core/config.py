@@ -3,6 +3,11 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_WARMUP: int = 5  # Connections opened at startup (0 disables)
+    DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statements per connection (0 disables, e.g. behind pgbouncer)
+    DB_QUERY_CACHE_SIZE: int = 1000  # SQLAlchemy compiled SQL cache per engine
 
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -1,9 +1,25 @@
+import asyncio
+import logging
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    # Filter combinations of the list endpoints each compile once and are reused from here
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    # asyncpg prepares each statement once per connection and reuses the server-side plan
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -24,3 +40,31 @@ async def get_db() -> AsyncSession:
             yield session
         finally:
             await session.close()
+
+
+async def warm_up_pool(connections: int) -> None:
+    """
+    Open `connections` pooled connections at startup so the first requests
+    don't pay for connection setup. Failures are logged, not raised.
+    """
+    connections = min(connections, settings.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+
+    async def _open():
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                # Hold the connection until all are open so the pool has to create each one
+                await barrier.wait()
+        except Exception:
+            # Release the connections still waiting on the barrier
+            await barrier.abort()
+            raise
+
+    barrier = asyncio.Barrier(connections)
+    try:
+        await asyncio.wait_for(asyncio.gather(*(_open() for _ in range(connections))), timeout=10)
+        logger.info(f"Database pool warmed up with {connections} connections")
+    except Exception as e:
+        logger.warning(f"Database pool warm-up failed: {e}")
@@ -0,0 +1,34 @@
+"""
+Conditional GET (ETag / If-None-Match) for read endpoints.
+
+The ETag is a hash of a cheap fingerprint query (ids and updated_at of every
+row the response is built from), so a client revalidating unchanged data
+gets 304 without the full query and response validation.
+"""
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+
+# Authenticated data: browsers may keep it, but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """Return a 304 response if If-None-Match matches etag, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in tags or etag in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination for lists ordered newest first by (created_at, id),
+for lists ordered by id, and for priority queues ordered by (priority DESC, created_at, id).
+
+The cursor is the sort key of the last row of a page, base64-encoded
+so clients treat it as an opaque string and pass it back unchanged.
+"""
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Return (created_at, id) from a cursor made by encode_cursor; 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_id_cursor(row_id: int) -> str:
+    """Cursor for lists ordered by id ascending, like the student list."""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Return the id from a cursor made by encode_id_cursor; 400 if it is malformed."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_queue_cursor(priority: int, created_at: datetime, row_id: int) -> str:
+    """Cursor for lists ordered by (priority DESC, created_at, id), like the waiting list."""
+    raw = f"{priority}|{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_queue_cursor(cursor: str) -> tuple[int, datetime, int]:
+    """Return (priority, created_at, id) from a cursor made by encode_queue_cursor; 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        priority, created_at, row_id = raw.split("|")
+        return int(priority), datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def split_page(rows: list, page_size: int) -> tuple[list, str | None]:
+    """
+    Split page_size + 1 fetched rows into the page and the cursor of the next
+    page (None on the last page). Rows need created_at and id attributes.
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+async def estimated_table_count(db: AsyncSession, table_name: str) -> int | None:
+    """
+    Row count of a whole table as estimated by the planner (pg_class.reltuples,
+    refreshed by VACUUM/ANALYZE). None if the table was never analyzed.
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
@@ -1,7 +1,10 @@
 import boto3
 import io
+from botocore.config import Config
+from typing import BinaryIO
 from uuid import uuid4
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from PIL import Image
 import fitz  # PyMuPDF
 from .config import settings
@@ -11,13 +14,147 @@ AWS_SECRET_ACCESS_KEY = settings.AWS_SECRET_ACCESS_KEY
 AWS_BUCKET_NAME = settings.AWS_BUCKET_NAME
 AWS_REGION = settings.AWS_REGION
 
+# One client for the whole process (boto3 clients are thread-safe); the pool has to
+# cover the documents create_student_with_contract uploads concurrently
 s3 = boto3.client(
     "s3",
     region_name=AWS_REGION,
     aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY
+    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    config=Config(max_pool_connections=32, retries={"mode": "adaptive"}),
 )
 
+def _convert_and_upload(fileobj: BinaryIO, filename: str, content_type: str | None, folder: str) -> str:
+    """
+    Blocking part of upload_image_to_s3: validate/convert the file with
+    PIL/PyMuPDF and upload it with boto3. Runs in the threadpool.
+
+    JPG/PNG files are uploaded straight from `fileobj` (the upload's spooled
+    temp file) without copying them into memory; only PDFs and images that
+    need conversion are read fully.
+    """
+    # Get file extension and content type
+    extension = filename.split('.')[-1].lower() if '.' in filename else ''
+    content_type = (content_type or "").lower()
+
+    # Block unsupported formats (Office documents)
+    unsupported_formats = ['docx', 'doc', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'csv']
+    if extension in unsupported_formats:
+        raise ValueError(
+            f"❌ {extension.upper()} format is not supported.\n"
+            f"✅ Please convert your file to PDF first, then upload.\n"
+            f"Supported formats: JPG, PNG, PDF"
+        )
+
+    # Check if content type suggests office document
+    office_content_types = ['word', 'excel', 'powerpoint', 'msword', 'ms-excel', 'sheet', 'document']
+    if any(office_type in content_type for office_type in office_content_types):
+        raise ValueError(
+            f"❌ Office documents are not supported.\n"
+            f"✅ Please convert to PDF first.\n"
+            f"Supported formats: JPG, PNG, PDF"
+        )
+
+    # Check if it's a PDF
+    is_pdf = extension == "pdf" or "pdf" in content_type
+
+    if is_pdf:
+        # Convert PDF to JPG (first page only)
+        try:
+            pdf_document = fitz.open(stream=fileobj.read(), filetype="pdf")
+
+            if pdf_document.page_count == 0:
+                raise ValueError("PDF file is empty or corrupted")
+
+            # Get first page
+            page = pdf_document[0]
+
+            # Render page to pixmap (high quality)
+            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x resolution
+
+            # Convert pixmap to JPEG bytes
+            img_data = pix.tobytes("jpeg")
+
+            # Save to buffer
+            buffer = io.BytesIO(img_data)
+            buffer.seek(0)
+
+            pdf_document.close()
+
+            # Set extension and content type
+            extension = "jpg"
+            final_content_type = "image/jpeg"
+
+        except Exception as pdf_error:
+            raise ValueError(f"Failed to convert PDF to JPG: {str(pdf_error)}")
+
+    else:
+        # For regular images (JPG, PNG, JPEG)
+        buffer = fileobj
+
+        # Validate it's actually an image
+        try:
+            img = Image.open(buffer)
+            img.verify()  # Verify it's a valid image
+            buffer.seek(0)  # Reset buffer position after verify
+
+            # Normalize extension
+            if extension in ["jpg", "jpeg"]:
+                extension = "jpg"
+                final_content_type = "image/jpeg"
+            elif extension == "png":
+                final_content_type = "image/png"
+            elif extension in ["gif", "bmp", "webp"]:
+                # Convert other formats to JPG
+                img = Image.open(buffer)
+                if img.mode in ("RGBA", "LA", "P"):
+                    # Convert transparency to white background
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    if img.mode == "P":
+                        img = img.convert("RGBA")
+                    background.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
+                    img = background
+                elif img.mode != "RGB":
+                    img = img.convert("RGB")
+
+                # Save as JPG
+                buffer = io.BytesIO()
+                img.save(buffer, format="JPEG", quality=95)
+                buffer.seek(0)
+                extension = "jpg"
+                final_content_type = "image/jpeg"
+            else:
+                raise ValueError(
+                    f"Unsupported image format: {extension}.\n"
+                    f"Supported formats: JPG, PNG, PDF"
+                )
+
+        except Exception as img_error:
+            error_msg = str(img_error)
+            if "cannot identify image file" in error_msg.lower():
+                raise ValueError(
+                    f"❌ File is not a valid image or PDF.\n"
+                    f"✅ Please upload: JPG, PNG, or PDF files only.\n"
+                    f"If you have a DOCX/DOC file, convert it to PDF first."
+                )
+            raise ValueError(f"Invalid image file: {error_msg}")
+
+    # Create S3 key
+    key = f"{folder}/{uuid4()}.{extension}"
+
+    # Upload to S3
+    s3.upload_fileobj(
+        Fileobj=buffer,
+        Bucket=AWS_BUCKET_NAME,
+        Key=key,
+        ExtraArgs={
+            "ContentType": final_content_type,
+        }
+    )
+
+    return f"https://{AWS_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{key}"
+
+
 async def upload_image_to_s3(file: UploadFile, folder: str = "contracts") -> str:
     """
     Upload image to S3 with automatic format conversion.
@@ -36,130 +173,11 @@ async def upload_image_to_s3(file: UploadFile, folder: str = "contracts") -> str
         return None
 
     try:
-        # Read file content
-        content = await file.read()
-
-        # Get file extension and content type
-        extension = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-        content_type = (file.content_type or "").lower()
-
-        # Block unsupported formats (Office documents)
-        unsupported_formats = ['docx', 'doc', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'csv']
-        if extension in unsupported_formats:
-            raise ValueError(
-                f"❌ {extension.upper()} format is not supported.\n"
-                f"✅ Please convert your file to PDF first, then upload.\n"
-                f"Supported formats: JPG, PNG, PDF"
-            )
-
-        # Check if content type suggests office document
-        office_content_types = ['word', 'excel', 'powerpoint', 'msword', 'ms-excel', 'sheet', 'document']
-        if any(office_type in content_type for office_type in office_content_types):
-            raise ValueError(
-                f"❌ Office documents are not supported.\n"
-                f"✅ Please convert to PDF first.\n"
-                f"Supported formats: JPG, PNG, PDF"
-            )
-
-        # Check if it's a PDF
-        is_pdf = extension == "pdf" or "pdf" in content_type
-
-        if is_pdf:
-            # Convert PDF to JPG (first page only)
-            try:
-                pdf_document = fitz.open(stream=content, filetype="pdf")
-
-                if pdf_document.page_count == 0:
-                    raise ValueError("PDF file is empty or corrupted")
-
-                # Get first page
-                page = pdf_document[0]
-
-                # Render page to pixmap (high quality)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x resolution
-
-                # Convert pixmap to JPEG bytes
-                img_data = pix.tobytes("jpeg")
-
-                # Save to buffer
-                buffer = io.BytesIO(img_data)
-                buffer.seek(0)
-
-                pdf_document.close()
-
-                # Set extension and content type
-                extension = "jpg"
-                final_content_type = "image/jpeg"
-
-            except Exception as pdf_error:
-                raise ValueError(f"Failed to convert PDF to JPG: {str(pdf_error)}")
-
-        else:
-            # For regular images (JPG, PNG, JPEG)
-            buffer = io.BytesIO(content)
-
-            # Validate it's actually an image
-            try:
-                img = Image.open(buffer)
-                img.verify()  # Verify it's a valid image
-                buffer.seek(0)  # Reset buffer position after verify
-
-                # Normalize extension
-                if extension in ["jpg", "jpeg"]:
-                    extension = "jpg"
-                    final_content_type = "image/jpeg"
-                elif extension == "png":
-                    final_content_type = "image/png"
-                elif extension in ["gif", "bmp", "webp"]:
-                    # Convert other formats to JPG
-                    img = Image.open(buffer)
-                    if img.mode in ("RGBA", "LA", "P"):
-                        # Convert transparency to white background
-                        background = Image.new("RGB", img.size, (255, 255, 255))
-                        if img.mode == "P":
-                            img = img.convert("RGBA")
-                        background.paste(img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None)
-                        img = background
-                    elif img.mode != "RGB":
-                        img = img.convert("RGB")
-
-                    # Save as JPG
-                    buffer = io.BytesIO()
-                    img.save(buffer, format="JPEG", quality=95)
-                    buffer.seek(0)
-                    extension = "jpg"
-                    final_content_type = "image/jpeg"
-                else:
-                    raise ValueError(
-                        f"Unsupported image format: {extension}.\n"
-                        f"Supported formats: JPG, PNG, PDF"
-                    )
-
-            except Exception as img_error:
-                error_msg = str(img_error)
-                if "cannot identify image file" in error_msg.lower():
-                    raise ValueError(
-                        f"❌ File is not a valid image or PDF.\n"
-                        f"✅ Please upload: JPG, PNG, or PDF files only.\n"
-                        f"If you have a DOCX/DOC file, convert it to PDF first."
-                    )
-                raise ValueError(f"Invalid image file: {error_msg}")
-
-        # Create S3 key
-        key = f"{folder}/{uuid4()}.{extension}"
-
-        # Upload to S3
-        s3.upload_fileobj(
-            Fileobj=buffer,
-            Bucket=AWS_BUCKET_NAME,
-            Key=key,
-            ExtraArgs={
-                "ContentType": final_content_type,
-            }
+        # The file object is read (or streamed to S3) in the threadpool
+        return await run_in_threadpool(
+            _convert_and_upload, file.file, file.filename, file.content_type, folder
         )
 
-        return f"https://{AWS_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{key}"
-
     except ValueError as ve:
         # Re-raise validation errors with clear message
         raise Exception(f"File validation error: {str(ve)}")
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -65,20 +66,26 @@ async def get_current_user(
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+@lru_cache(maxsize=None)
 def require_permission(permission_code: str):
-    async def permission_checker(
-        user: CurrentUser,
-        db: Annotated[AsyncSession, Depends(get_db)],
-    ) -> User:
+    """
+    Dependency that lets the current user through only with permission_code.
+
+    Cached per permission code: every route guarded by the same permission shares
+    one dependency callable, so FastAPI resolves it once per request even when a
+    route lists it both in dependencies=[...] and as a parameter.
+    """
+    async def permission_checker(user: CurrentUser) -> User:
         if user.is_super_admin:
             return user
 
-        user_permissions = set()
-        for role in user.roles:
-            for perm in role.permissions:
-                user_permissions.add(perm.code)
+        has_permission = any(
+            perm.code == permission_code
+            for role in user.roles
+            for perm in role.permissions
+        )
 
-        if permission_code not in user_permissions:
+        if not has_permission:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permission denied: {permission_code}",
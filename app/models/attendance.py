@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import String, DateTime, Date, Time, Boolean, Text, Enum as SAEnum, ForeignKey
+from sqlalchemy import String, DateTime, Date, Time, Boolean, Text, Enum as SAEnum, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 from app.models.base import TimestampMixin
@@ -8,6 +8,10 @@ from app.models.enums import AttendanceStatus
 
 class Session(Base, TimestampMixin):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Attendance filters: EXISTS on session by group and date range
+        Index("ix_sessions_group_id_session_date", "group_id", "session_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     session_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
@@ -27,6 +31,13 @@ class Session(Base, TimestampMixin):
 
 class Attendance(Base, TimestampMixin):
     __tablename__ = "attendances"
+    __table_args__ = (
+        # Newest-first listing and keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_attendances_created_at_id", "created_at", "id"),
+        Index("ix_attendances_student_created_at", "student_id", "created_at", "id"),
+        # Joins from sessions (group filter) and session-based attendance lookups
+        Index("ix_attendances_session_id", "session_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     status: Mapped[AttendanceStatus] = mapped_column(
@@ -47,6 +58,10 @@ class Attendance(Base, TimestampMixin):
 
 class GateLog(Base, TimestampMixin):
     __tablename__ = "gate_logs"
+    __table_args__ = (
+        # Per-student history, newest first
+        Index("ix_gate_logs_student_created_at", "student_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     allowed: Mapped[bool] = mapped_column(Boolean, nullable=False)
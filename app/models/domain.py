@@ -1,5 +1,6 @@
 from datetime import date, datetime
-from sqlalchemy import String, Date, DateTime, Integer, Numeric, Text, Enum as SAEnum, ForeignKey
+from sqlalchemy import String, Date, DateTime, Integer, Numeric, Text, Enum as SAEnum, ForeignKey, Index, Computed, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 from app.models.base import TimestampMixin
@@ -8,12 +9,33 @@ from app.models.enums import StudentStatus, ContractStatus, DayOfWeek, GroupStat
 
 class Student(Base, TimestampMixin):
     __tablename__ = "students"
+    __table_args__ = (
+        # Trigram indexes for ILIKE '%q%' search (requires pg_trgm extension)
+        Index("ix_students_first_name_trgm", "first_name", postgresql_using="gin", postgresql_ops={"first_name": "gin_trgm_ops"}),
+        Index("ix_students_last_name_trgm", "last_name", postgresql_using="gin", postgresql_ops={"last_name": "gin_trgm_ops"}),
+        Index("ix_students_phone_trgm", "phone", postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}),
+        # B-tree indexes for prefix search (LIKE 'q%') on the generated columns below
+        Index("ix_students_first_name_lower", "first_name_lower", postgresql_ops={"first_name_lower": "text_pattern_ops"}),
+        Index("ix_students_last_name_lower", "last_name_lower", postgresql_ops={"last_name_lower": "text_pattern_ops"}),
+        Index("ix_students_phone_normalized", "phone_normalized", postgresql_ops={"phone_normalized": "text_pattern_ops"}),
+        # Default student list / year archiving: current year's non-archived students by id
+        Index(
+            "ix_students_year_not_archived",
+            "archive_year",
+            "id",
+            postgresql_where=text("status <> 'ARCHIVED'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     date_of_birth: Mapped[date] = mapped_column(Date, nullable=False)
     phone: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # Generated by PostgreSQL for prefix search, never written by the app
+    first_name_lower: Mapped[str | None] = mapped_column(Text, Computed("lower(first_name)", persisted=True))
+    last_name_lower: Mapped[str | None] = mapped_column(Text, Computed("lower(last_name)", persisted=True))
+    phone_normalized: Mapped[str | None] = mapped_column(Text, Computed("regexp_replace(phone, '[^0-9]', '', 'g')", persisted=True))
     address: Mapped[str | None] = mapped_column(Text, nullable=True)
     photo_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
     face_id: Mapped[str | None] = mapped_column(String(255), unique=True, index=True, nullable=True)
@@ -35,6 +57,9 @@ class Student(Base, TimestampMixin):
 
 class Parent(Base, TimestampMixin):
     __tablename__ = "parents"
+    __table_args__ = (
+        Index("ix_parents_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -69,7 +94,7 @@ class Group(Base, TimestampMixin):
     # Archive year - used for yearly data separation (2025, 2026, etc.)
     archive_year: Mapped[int] = mapped_column(Integer, nullable=False, index=True, server_default="2025")
 
-    coach_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    coach_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
 
     coach: Mapped["User"] = relationship("User")
     students: Mapped[list["Student"]] = relationship("Student", back_populates="group")
@@ -79,6 +104,9 @@ class Group(Base, TimestampMixin):
 
 class Contract(Base, TimestampMixin):
     __tablename__ = "contracts"
+    __table_args__ = (
+        Index("ix_contracts_contract_number_trgm", "contract_number", postgresql_using="gin", postgresql_ops={"contract_number": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     contract_number: Mapped[str] = mapped_column(String(50), unique=True, nullable=False, index=True)
@@ -96,16 +124,17 @@ class Contract(Base, TimestampMixin):
     birth_year: Mapped[int] = mapped_column(Integer, nullable=False, index=True)  # Student birth year for contract numbering
     sequence_number: Mapped[int] = mapped_column(Integer, nullable=False)  # Sequence within birth year (1-capacity)
 
-    # Document file paths (JSON array stored as text)
+    # Document file paths
     passport_copy_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     form_086_url: Mapped[str | None] = mapped_column(Text, nullable=True)  # Medical certificate
     heart_checkup_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     birth_certificate_url: Mapped[str | None] = mapped_column(Text, nullable=True)  # Passport or birth certificate
-    contract_images_urls: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON array of 5 contract page URLs
+    contract_images_urls: Mapped[list | None] = mapped_column(JSONB, nullable=True)  # JSON array of 5 contract page URLs
     final_pdf_url: Mapped[str | None] = mapped_column(Text, nullable=True)  # Merged PDF with all documents
+    pdf_error: Mapped[str | None] = mapped_column(Text, nullable=True)  # Last background PDF render failure, cleared on success
 
     # Editable fields (from handwritten parts)
-    custom_fields: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON object for custom fields
+    custom_fields: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # JSON object for custom fields
 
     # Termination fields
     terminated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -131,6 +160,18 @@ class WaitingList(Base, TimestampMixin):
     When a spot opens in the group, admin can contact parents and register the student.
     """
     __tablename__ = "waiting_list"
+    __table_args__ = (
+        # One entry per student per group; add_to_waiting_list inserts with ON CONFLICT DO NOTHING on it
+        Index(
+            "ix_waiting_list_student_group",
+            "student_first_name", "student_last_name", "birth_year", "group_id",
+            unique=True,
+        ),
+        # Queue order (priority DESC, created_at, id): per group for get_next_in_queue and
+        # the group-filtered list, and without group for the unfiltered list
+        Index("ix_waiting_list_group_queue", "group_id", text("priority DESC"), "created_at", "id"),
+        Index("ix_waiting_list_queue", text("priority DESC"), "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
@@ -153,6 +194,7 @@ class WaitingList(Base, TimestampMixin):
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     added_by_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
-    # Relationships (no student relationship - independent data)
-    group: Mapped["Group"] = relationship("Group", back_populates="waiting_list")
-    added_by: Mapped["User"] = relationship("User")
+    # Relationships (no student relationship - independent data).
+    # raise_on_sql: loading them lazily per row is an error, queries that need them must eager-load
+    group: Mapped["Group"] = relationship("Group", back_populates="waiting_list", lazy="raise_on_sql")
+    added_by: Mapped["User"] = relationship("User", lazy="raise_on_sql")
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import String, Numeric, DateTime, Text, Enum as SAEnum, ForeignKey, Integer, JSON
+from sqlalchemy import String, Numeric, DateTime, Text, Enum as SAEnum, ForeignKey, Integer, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 from app.models.base import TimestampMixin
@@ -8,6 +9,37 @@ from app.models.enums import PaymentStatus, PaymentSource
 
 class Transaction(Base, TimestampMixin):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Debt/unpaid lookups: student + year + status, then payment_months @> [month]
+        Index("ix_transactions_student_year_status", "student_id", "payment_year", "status"),
+        Index(
+            "ix_transactions_payment_months_gin",
+            "payment_months",
+            postgresql_using="gin",
+            postgresql_ops={"payment_months": "jsonb_path_ops"},
+            postgresql_where=text("status = 'SUCCESS'"),
+        ),
+        # Per-contract paid sums (exports, payment status): index-only scan over SUCCESS rows
+        Index(
+            "ix_transactions_paid_lookup",
+            "student_id",
+            "contract_id",
+            "payment_year",
+            postgresql_include=["amount"],
+            postgresql_where=text("status = 'SUCCESS'"),
+        ),
+        # Newest-first listing and keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        # Same ordering under the common list filters (B-tree is walked backwards for DESC)
+        Index("ix_transactions_year_created_at", "payment_year", "created_at", "id"),
+        Index("ix_transactions_student_created_at", "student_id", "created_at", "id"),
+        Index(
+            "ix_transactions_unassigned_created_at",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'UNASSIGNED'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     external_id: Mapped[str | None] = mapped_column(String(255), unique=True, nullable=True, index=True)
@@ -23,7 +55,7 @@ class Transaction(Base, TimestampMixin):
     cancelled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
     payment_year: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    payment_months: Mapped[list | None] = mapped_column(JSON, nullable=True)  # List of months (1-12)
+    payment_months: Mapped[list | None] = mapped_column(JSONB, nullable=True)  # List of months (1-12)
 
 
     student_id: Mapped[int | None] = mapped_column(
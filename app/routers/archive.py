@@ -16,6 +16,7 @@ from app.models.auth import User
 from app.models.enums import GroupStatus, StudentStatus, ContractStatus
 from app.schemas.common import DataResponse
 from app.schemas.contract import ContractRead
+from app.services.debt import mark_debt_changed
 
 router = APIRouter(prefix="/archive", tags=["Archive"])
 
@@ -117,6 +118,7 @@ async def archive_year_data(
         .values(status=ContractStatus.ARCHIVED)
     )
 
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={
@@ -206,6 +208,7 @@ async def unarchive_year_data(
         .values(status=ContractStatus.ACTIVE)
     )
 
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={
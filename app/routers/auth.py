@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
 from app.core.db import get_db
 from app.core.security import verify_password, create_access_token, hash_password, create_refresh_token, decode_refresh_token
 from app.models.auth import User
@@ -25,7 +26,8 @@ async def login(
     )
     user = result.scalars().first()
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    # bcrypt verify is CPU-bound, run it in the threadpool
+    if not user or not await run_in_threadpool(verify_password, credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone/email or password",
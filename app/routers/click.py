@@ -2,8 +2,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, cast
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 import hashlib
@@ -480,7 +479,7 @@ async def click_payment(
                 Transaction.contract_id == contract.id,
                 Transaction.status == PaymentStatus.SUCCESS,
                 Transaction.payment_year == payment_year,
-                cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB))
+                Transaction.payment_months.contains([payment_month])
             )
         )
         duplicate = duplicate_check.scalar_one_or_none()
@@ -689,7 +688,7 @@ async def click_payment(
                 Transaction.contract_id == contract.id,
                 Transaction.status == PaymentStatus.SUCCESS,
                 Transaction.payment_year == payment_year,
-                cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB)),
+                Transaction.payment_months.contains([payment_month]),
                 Transaction.id != transaction.id
             )
         )
@@ -2,8 +2,8 @@ from typing import Annotated, Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, func, exists
+from sqlalchemy.orm import selectinload, raiseload
 from app.models.enums import AttendanceStatus
 from app.core.db import get_db
 from app.core.permissions import PERM_ATTENDANCE_COACH_MARK
@@ -405,25 +405,21 @@ async def get_coach_created_attendances(
     - student_id: Filter by specific student
     """
     # Build query for attendances created by this coach
-    attendance_query = select(Attendance).options(
-        selectinload(Attendance.student),
-        selectinload(Attendance.session).selectinload(Session.group),
-        selectinload(Attendance.marked_by)
-    ).where(Attendance.marked_by_user_id == user.id)
+    # AttendanceRead only has column fields: no relationships to load
+    attendance_query = select(Attendance).options(raiseload("*")).where(Attendance.marked_by_user_id == user.id)
 
-    # Apply date filters via session
-    if from_date or to_date:
-        attendance_query = attendance_query.join(Session)
-        if from_date:
-            attendance_query = attendance_query.where(Session.session_date >= from_date)
-        if to_date:
-            attendance_query = attendance_query.where(Session.session_date <= to_date)
-
-    # Apply group filter via session
+    # Apply date/group filters via session as one EXISTS (no join, index on sessions(group_id, session_date))
+    session_filters = []
+    if from_date:
+        session_filters.append(Session.session_date >= from_date)
+    if to_date:
+        session_filters.append(Session.session_date <= to_date)
     if group_id:
-        if not (from_date or to_date):  # Only join if not already joined
-            attendance_query = attendance_query.join(Session)
-        attendance_query = attendance_query.where(Session.group_id == group_id)
+        session_filters.append(Session.group_id == group_id)
+    if session_filters:
+        attendance_query = attendance_query.where(
+            exists().where(Session.id == Attendance.session_id, *session_filters)
+        )
 
     # Apply student filter
     if student_id:
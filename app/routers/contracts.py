@@ -4,9 +4,9 @@ import json
 import uuid
 import os
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, update
 from sqlalchemy.orm import selectinload
 from app.core.db import get_db
 from app.core.permissions import PERM_CONTRACTS_VIEW, PERM_CONTRACTS_EDIT
@@ -23,6 +23,7 @@ from app.schemas.common import DataResponse, PaginationMeta
 from app.deps import require_permission, CurrentUser
 from app.models.auth import User
 from app.models.enums import ContractStatus, PaymentStatus
+from app.services.debt import mark_debt_changed
 from app.services.contract_allocation import (
     get_available_contract_numbers,
     is_group_full,
@@ -105,12 +106,7 @@ async def get_contracts(
 
     return DataResponse(
         data=[ContractRead.model_validate(c) for c in contracts],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
 
 
@@ -148,6 +144,10 @@ async def update_contract(
 
     update_data = data.model_dump(exclude_unset=True)
 
+    # custom_fields is a JSONB column, store it in its JSON-compatible form
+    if data.custom_fields is not None:
+        update_data["custom_fields"] = data.custom_fields.model_dump(mode="json")
+
     # Check for duplicate contract number if it's being updated
     if "contract_number" in update_data:
         existing_contract = await db.execute(
@@ -324,24 +324,23 @@ async def bulk_delete_contracts(
     if not contract_ids:
         raise HTTPException(status_code=400, detail="No contract IDs provided")
 
-    deleted_count = 0
-    errors = []
-
-    for contract_id in contract_ids:
-        try:
-            result = await db.execute(select(Contract).where(Contract.id == contract_id))
-            contract = result.scalar_one_or_none()
-
-            if not contract:
-                errors.append({"contract_id": contract_id, "error": "Contract not found"})
-                continue
-
-            # Soft delete: set status to DELETED instead of actually deleting
-            contract.status = ContractStatus.DELETED
-            deleted_count += 1
-        except Exception as e:
-            errors.append({"contract_id": contract_id, "error": str(e)})
-
+    # Soft delete: set status to DELETED instead of actually deleting, in one UPDATE ... RETURNING
+    result = await db.execute(
+        update(Contract)
+        .where(Contract.id.in_(contract_ids))
+        .values(status=ContractStatus.DELETED)
+        .returning(Contract.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars().all())
+    deleted_count = len(deleted_ids)
+    errors = [
+        {"contract_id": contract_id, "error": "Contract not found"}
+        for contract_id in contract_ids
+        if contract_id not in deleted_ids
+    ]
+
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={
@@ -472,8 +471,8 @@ async def create_contract_with_file_upload(
         form_086_url=form_086_url,
         heart_checkup_url=heart_url,
         birth_certificate_url=birth_cert_url,
-        contract_images_urls=json.dumps(contract_image_urls),
-        custom_fields=json.dumps(custom_fields.model_dump(), ensure_ascii=False, default=str)
+        contract_images_urls=contract_image_urls,
+        custom_fields=custom_fields.model_dump(mode="json")
     )
 
     db.add(contract)
@@ -553,8 +552,7 @@ async def get_next_available_number(
     Example: If group B1 (birth year 2020) has 1-2020B1, 2-2020B1, 3-2020B1 used, returns 4-2020B1.
     """
     # Get group
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
@@ -633,6 +631,11 @@ async def get_contract_pdf_url(
         )
 
     if not contract.final_pdf_url:
+        if contract.pdf_error:
+            raise HTTPException(
+                status_code=500,
+                detail=f"PDF generation failed for contract {contract_number}: {contract.pdf_error}"
+            )
         raise HTTPException(
             status_code=404,
             detail=f"PDF not generated for contract {contract_number} yet"
@@ -642,6 +645,41 @@ async def get_contract_pdf_url(
     return JSONResponse(content={"pdf_url": contract.final_pdf_url})
 
 
+@router.get("/{contract_id}/pdf", dependencies=[Depends(require_permission(PERM_CONTRACTS_VIEW))])
+async def get_contract_pdf(
+    contract_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Download the generated contract PDF.
+
+    Redirects to the PDF in S3, which serves it with Range/ETag support.
+    Returns 404 while the PDF is still being generated in the background,
+    and 500 with the stored error if the background render failed.
+
+    Example:
+        GET /contracts/15/pdf
+    """
+    result = await db.execute(
+        select(Contract.final_pdf_url, Contract.pdf_error).where(Contract.id == contract_id)
+    )
+    row = result.one_or_none()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Contract not found")
+
+    if not row.final_pdf_url:
+        if row.pdf_error:
+            raise HTTPException(status_code=500, detail=f"PDF generation failed for this contract: {row.pdf_error}")
+        raise HTTPException(status_code=404, detail="PDF not generated for this contract yet")
+
+    return RedirectResponse(
+        url=row.final_pdf_url,
+        status_code=307,
+        headers={"Cache-Control": "private, max-age=86400"},
+    )
+
+
 @router.get("/{contract_number}/payment-status", response_model=DataResponse[ContractPaymentStatus], dependencies=[Depends(require_permission(PERM_CONTRACTS_VIEW))])
 async def get_contract_payment_status(
     contract_number: str,
@@ -660,8 +698,6 @@ async def get_contract_payment_status(
         GET /contracts/1-2020B1/payment-status
     """
     from datetime import date as date_class
-    from sqlalchemy.dialects.postgresql import JSONB
-    from sqlalchemy import cast
 
     # Find contract
     result = await db.execute(
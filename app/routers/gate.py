@@ -70,10 +70,5 @@ async def get_gate_logs(
 
     return DataResponse(
         data=[GateLogRead.model_validate(log) for log in logs],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
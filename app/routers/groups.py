@@ -1,7 +1,7 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, update, exists
 from collections import defaultdict
 from app.core.db import get_db
 from app.core.permissions import PERM_GROUPS_VIEW, PERM_GROUPS_EDIT
@@ -98,12 +98,7 @@ async def get_groups(
 
     return DataResponse(
         data=groups_data,
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
 
 
@@ -220,15 +215,13 @@ async def create_group(
     Multiple groups can have the same birth year as long as identifiers are different.
     """
     # Check if identifier already exists (excluding DELETED groups)
-    existing_identifier = await db.execute(
-        select(Group).where(
-            and_(
-                Group.identifier == data.identifier,
-                Group.status != GroupStatus.DELETED
-            )
-        )
+    identifier_taken = await db.scalar(
+        select(exists().where(
+            Group.identifier == data.identifier,
+            Group.status != GroupStatus.DELETED
+        ))
     )
-    if existing_identifier.scalar_one_or_none():
+    if identifier_taken:
         raise HTTPException(
             status_code=400,
             detail=f"Identifier '{data.identifier}' already exists. Please use a unique identifier."
@@ -236,8 +229,7 @@ async def create_group(
 
     if data.coach_id:
         from app.models.auth import User
-        coach_result = await db.execute(select(User).where(User.id == data.coach_id))
-        if not coach_result.scalar_one_or_none():
+        if not await db.scalar(select(exists().where(User.id == data.coach_id))):
             raise HTTPException(status_code=404, detail=f"Coach with ID {data.coach_id} not found")
 
     from datetime import datetime
@@ -313,8 +305,7 @@ async def update_group(
 
     if "coach_id" in update_data and update_data["coach_id"] is not None:
         from app.models.auth import User
-        coach_result = await db.execute(select(User).where(User.id == update_data["coach_id"]))
-        if not coach_result.scalar_one_or_none():
+        if not await db.scalar(select(exists().where(User.id == update_data["coach_id"]))):
             raise HTTPException(status_code=404, detail=f"Coach with ID {update_data['coach_id']} not found")
 
     for field, value in update_data.items():
@@ -387,23 +378,21 @@ async def bulk_delete_groups(
     if not group_ids:
         raise HTTPException(status_code=400, detail="No group IDs provided")
 
-    deleted_count = 0
-    errors = []
-
-    for group_id in group_ids:
-        try:
-            result = await db.execute(select(Group).where(Group.id == group_id))
-            group = result.scalar_one_or_none()
-
-            if not group:
-                errors.append({"group_id": group_id, "error": "Group not found"})
-                continue
-
-            # Soft delete: set status to DELETED instead of actually deleting
-            group.status = GroupStatus.DELETED
-            deleted_count += 1
-        except Exception as e:
-            errors.append({"group_id": group_id, "error": str(e)})
+    # Soft delete: set status to DELETED instead of actually deleting, in one UPDATE ... RETURNING
+    result = await db.execute(
+        update(Group)
+        .where(Group.id.in_(group_ids))
+        .values(status=GroupStatus.DELETED)
+        .returning(Group.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars().all())
+    deleted_count = len(deleted_ids)
+    errors = [
+        {"group_id": group_id, "error": "Group not found"}
+        for group_id in group_ids
+        if group_id not in deleted_ids
+    ]
 
     await db.commit()
 
@@ -12,6 +12,7 @@ from app.deps import require_permission, CurrentUser
 from app.models.domain import Student, Parent, Contract, Group
 from app.models.finance import Transaction
 from app.models.enums import StudentStatus, ContractStatus, PaymentStatus, PaymentSource
+from app.services.student import existing_face_ids
 
 router = APIRouter(prefix="/import", tags=["Import"])
 
@@ -59,6 +60,17 @@ async def import_students(
         error_count = 0
         errors = []
 
+        # Face IDs already taken, looked up once for the whole file instead of per row
+        face_id_column = headers.index('face_id') if 'face_id' in headers else None
+        taken_face_ids = set()
+        if face_id_column is not None:
+            file_face_ids = {
+                str(row[face_id_column])
+                for row in sheet.iter_rows(min_row=2, values_only=True)
+                if face_id_column < len(row) and row[face_id_column]
+            }
+            taken_face_ids = await existing_face_ids(db, list(file_face_ids))
+
         # Process each row (skip header)
         for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
             try:
@@ -81,12 +93,8 @@ async def import_students(
                     raise ValueError(f"Invalid date_of_birth format in row {row_num}")
 
                 # Check if face_id already exists
-                if row_data.get('face_id'):
-                    existing_face_id = await db.execute(
-                        select(Student).where(Student.face_id == row_data['face_id'])
-                    )
-                    if existing_face_id.scalar_one_or_none():
-                        raise ValueError(f"Face ID {row_data['face_id']} already exists")
+                if row_data.get('face_id') and str(row_data['face_id']) in taken_face_ids:
+                    raise ValueError(f"Face ID {row_data['face_id']} already exists")
 
                 # Get or find group
                 group_id = None
@@ -184,6 +192,9 @@ async def import_students(
 
                 await db.commit()
                 success_count += 1
+                # Later rows of the same file can't reuse this face ID
+                if row_data.get('face_id'):
+                    taken_face_ids.add(str(row_data['face_id']))
 
             except Exception as e:
                 await db.rollback()
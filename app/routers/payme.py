@@ -2,7 +2,6 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, cast
-from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 import base64
@@ -402,7 +401,7 @@ async def check_perform_transaction(params: dict, request_id: int, db: AsyncSess
             Transaction.contract_id == contract.id,
             Transaction.status == PaymentStatus.SUCCESS,
             Transaction.payment_year == payment_year,
-            cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB))
+            Transaction.payment_months.contains([payment_month])
         )
     )
     duplicate = duplicate_check.scalar_one_or_none()
@@ -699,7 +698,7 @@ async def create_transaction(params: dict, request_id: int, db: AsyncSession):
             Transaction.contract_id == contract.id,
             Transaction.status == PaymentStatus.PENDING,
             Transaction.payment_year == payment_year,
-            cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB)),
+            Transaction.payment_months.contains([payment_month]),
             Transaction.external_id != str(payme_id)
         )
     )
@@ -726,7 +725,7 @@ async def create_transaction(params: dict, request_id: int, db: AsyncSession):
             Transaction.contract_id == contract.id,
             Transaction.status == PaymentStatus.SUCCESS,
             Transaction.payment_year == payment_year,
-            cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB))
+            Transaction.payment_months.contains([payment_month])
         )
     )
     success_payment = success_result.scalar_one_or_none()
@@ -915,7 +914,7 @@ async def perform_transaction(params: dict, request_id: int, db: AsyncSession):
             Transaction.contract_id == contract.id,
             Transaction.status == PaymentStatus.SUCCESS,
             Transaction.payment_year == payment_year,
-            cast(Transaction.payment_months, JSONB).op('@>')(cast([payment_month], JSONB)),
+            Transaction.payment_months.contains([payment_month]),
             Transaction.id != transaction.id
         )
     )
@@ -229,10 +229,5 @@ async def get_debtors_report(
 
     return DataResponse(
         data=paginated_debtors,
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=len(debtors),
-            total_pages=(len(debtors) + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, len(debtors)),
     )
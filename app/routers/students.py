@@ -1,14 +1,24 @@
+import os
+import re
+import tempfile
+from decimal import Decimal
 from typing import Annotated, Optional, List
-from fastapi import APIRouter, Depends, HTTPException, Query, File, Form, UploadFile
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, File, Form, UploadFile, BackgroundTasks
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, cast
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import select, func, or_, update, cast, exists, tuple_, Integer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from io import BytesIO
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
 from datetime import datetime, date
-from app.core.db import get_db
+from app.core.db import get_db, AsyncSessionLocal
+from app.core.pagination import decode_cursor, split_page, encode_id_cursor, decode_id_cursor
 from app.core.permissions import PERM_STUDENTS_VIEW, PERM_STUDENTS_EDIT, PERM_ATTENDANCE_VIEW
 from app.models.domain import Student
 from app.models.finance import Transaction
@@ -22,11 +32,199 @@ from app.schemas.common import DataResponse, PaginationMeta
 from app.schemas.student_with_contract import StudentWithContractCreate, StudentWithContractResponse
 from app.deps import require_permission, CurrentUser
 from app.models.auth import User
-from app.core.s3 import upload_image_to_s3, upload_pdf_to_s3
-from app.utils.contract_pdf import ContractPDFGenerator
+from app.core.s3 import upload_image_to_s3
+from app.services.contract_pdf import render_contract_pdf
+from app.services.debt import unpaid_students_query, unpaid_students_cache, month_range, mark_debt_changed
+from app.services.student import existing_face_ids
+from app.utils.contract_pdf import format_amount
 
 router = APIRouter(prefix="/students", tags=["Students"])
 
+# Validate a whole page of ORM rows in one call instead of model_validate per row
+_students_adapter = TypeAdapter(list[StudentRead])
+_debt_info_adapter = TypeAdapter(list[StudentDebtInfo])
+_attendances_adapter = TypeAdapter(list[AttendanceRead])
+_transactions_adapter = TypeAdapter(list[TransactionRead])
+_gatelogs_adapter = TypeAdapter(list[GateLogRead])
+
+
+def _student_text_filters(term: str, prefix: bool, with_phone: bool = True) -> list:
+    """
+    Name (and phone) conditions for student search.
+
+    prefix=True matches from the start of the value using the generated
+    lowercase/digits-only columns (b-tree indexed), otherwise ILIKE '%term%'
+    anywhere in the value (trigram indexed).
+    """
+    if not prefix:
+        pattern = f"%{term}%"
+        filters = [Student.first_name.ilike(pattern), Student.last_name.ilike(pattern)]
+        if with_phone:
+            filters.append(Student.phone.ilike(pattern))
+        return filters
+
+    pattern = f"{term.lower()}%"
+    filters = [Student.first_name_lower.like(pattern), Student.last_name_lower.like(pattern)]
+    digits = re.sub(r"\D", "", term)
+    if with_phone and digits:
+        filters.append(Student.phone_normalized.like(f"{digits}%"))
+    return filters
+
+
+# Excel export styles and headers, shared by every export request
+# (openpyxl style objects are immutable, so one instance can be reused;
+# NamedStyle binds to a workbook, so those are created per workbook)
+_HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+_HEADER_FONT = Font(color="FFFFFF", bold=True, size=11)
+_BOLD_FONT = Font(bold=True)
+_ITALIC_FONT = Font(italic=True)
+
+_UNPAID_HEADERS = (
+    "ID",
+    "First Name",
+    "Last Name",
+    "Phone",
+    "Group",
+    "Expected Amount",
+    "Paid Amount",
+    "Debt Amount",
+    "Active Contracts",
+)
+_UNPAID_WIDTHS = (8, 15, 15, 15, 20, 15, 15, 15, 18)
+
+_COMPREHENSIVE_HEADERS = (
+    "Student ID",
+    "First Name",
+    "Last Name",
+    "Date of Birth",
+    "Phone",
+    "Address",
+    "Status",
+    "Group",
+    "Parent Names",
+    "Parent Phones",
+    "Contract Number",
+    "Contract Start",
+    "Contract End",
+    "Contract Status",
+    "Monthly Fee",
+    "Terminated At",
+    "Termination Reason",
+    "Paid Months",
+    "Unpaid Months",
+    "Total Expected",
+    "Total Paid",
+    "Debt Amount",
+)
+_COMPREHENSIVE_WIDTHS = (12, 15, 15, 15, 15, 30, 12, 20, 25, 20, 18, 15, 15, 15, 12, 15, 20, 50, 50, 15, 15, 15)
+
+# Students loaded per batch in the comprehensive export
+_EXPORT_BATCH_SIZE = 500
+
+_ZERO = Decimal(0)
+
+
+def _styled_cell(ws, value, style: str) -> WriteOnlyCell:
+    """Write-only cell using one of the named styles registered by _new_export_sheet."""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _new_export_sheet(title: str, headers: tuple, widths: tuple, header_alignment: Alignment):
+    """
+    Create a write-only workbook with one sheet, the column widths and the header row.
+
+    Named styles "header", "total" and "note" are registered on the workbook
+    once; cells refer to them by name instead of carrying their own
+    font/fill/alignment.
+    """
+    # Write-only mode: rows are streamed to the file instead of keeping
+    # a Cell object for every value in memory
+    wb = Workbook(write_only=True)
+    wb.add_named_style(NamedStyle(name="header", font=_HEADER_FONT, fill=_HEADER_FILL, alignment=header_alignment))
+    wb.add_named_style(NamedStyle(name="total", font=_BOLD_FONT))
+    wb.add_named_style(NamedStyle(name="note", font=_ITALIC_FONT))
+    ws = wb.create_sheet(title)
+
+    # Column widths must be set before any row is written
+    for index, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.append([_styled_cell(ws, header, "header") for header in headers])
+    return wb, ws
+
+
+async def _workbook_response(wb: Workbook, filename: str) -> FileResponse:
+    """
+    Save the workbook to a temporary file and send it from disk.
+
+    The .xlsx is never held in memory as a whole; the file is removed once
+    the response has been sent.
+    """
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
+    tmp.close()
+    try:
+        await run_in_threadpool(wb.save, tmp.name)
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+
+    return FileResponse(
+        tmp.name,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=filename,
+        background=BackgroundTask(os.unlink, tmp.name),
+    )
+
+
+async def _student_history_page(db: AsyncSession, model, student_id: int, page: int | None, page_size: int | None):
+    """
+    One page of a student's rows of model (transactions, attendances, gate logs),
+    newest first, as plain rows (Core select over the table, no ORM instances),
+    together with its PaginationMeta.
+
+    Without page and page_size the whole history is returned and meta is None,
+    as before these lists were paginated.
+    """
+    if page is None and page_size is None:
+        query = (
+            select(model.__table__)
+            .where(model.student_id == student_id)
+            .order_by(model.created_at.desc(), model.id.desc())
+        )
+        return (await db.execute(query)).all(), None
+
+    page = page or 1
+    page_size = page_size or 100
+    query = (
+        select(model.__table__, func.count().over().label("total"))
+        .where(model.student_id == student_id)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    rows = (await db.execute(query)).all()
+
+    if rows:
+        total = rows[0].total
+    else:
+        # A page past the end has no rows to carry the window count
+        total = await db.scalar(select(func.count()).where(model.student_id == student_id)) or 0
+
+    return rows, PaginationMeta.for_page(page, page_size, total)
+
+
+async def _scalars_in_own_session(query) -> list:
+    """
+    Run query on a short-lived session of its own and return the ORM rows.
+
+    An AsyncSession runs one statement at a time, so independent reads that
+    should overlap with the request session's queries go through here.
+    Only column attributes are safe to read on the returned (detached) rows.
+    """
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(query)).scalars().all()
+
 
 @router.get("/search", response_model=DataResponse[list[StudentRead]], dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
 async def search_students(
@@ -34,6 +232,7 @@ async def search_students(
     query: str = Query(..., description="Search by first name, last name, contract number, phone, or parent email"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    prefix: bool = Query(False, description="Match from the start of name/phone/contract number/email instead of anywhere"),
 ):
     """
     Comprehensive search for students by:
@@ -45,66 +244,38 @@ async def search_students(
     """
     from app.models.domain import Contract, Parent
 
-    # Search students by name or phone
-    students_query = select(Student).where(
-        or_(
-            Student.first_name.ilike(f"%{query}%"),
-            Student.last_name.ilike(f"%{query}%"),
-            Student.phone.ilike(f"%{query}%"),
-        )
-    ).distinct()
-
-    # Search by contract number
-    contracts_result = await db.execute(
-        select(Contract.student_id).where(Contract.contract_number.ilike(f"%{query}%"))
-    )
-    student_ids_from_contracts = [row[0] for row in contracts_result.fetchall()]
-
-    # Search by parent email
-    parents_result = await db.execute(
-        select(Parent.student_id).where(Parent.email.ilike(f"%{query}%"))
+    pattern = f"{query}%" if prefix else f"%{query}%"
+    search_filter = or_(
+        *_student_text_filters(query, prefix),
+        # Search by contract number
+        Student.id.in_(select(Contract.student_id).where(Contract.contract_number.ilike(pattern))),
+        # Search by parent email
+        Student.id.in_(select(Parent.student_id).where(Parent.email.ilike(pattern))),
     )
-    student_ids_from_parents = [row[0] for row in parents_result.fetchall()]
-
-    # Combine all student IDs
-    all_student_ids = set(student_ids_from_contracts + student_ids_from_parents)
-
-    # If we found students via contracts or parents, add them to the query
-    if all_student_ids:
-        students_query = select(Student).where(
-            or_(
-                Student.first_name.ilike(f"%{query}%"),
-                Student.last_name.ilike(f"%{query}%"),
-                Student.phone.ilike(f"%{query}%"),
-                Student.id.in_(all_student_ids)
-            )
-        ).distinct()
 
-    # Apply pagination
+    # Total comes back on every row via a window count, so one query serves both page and count
     offset = (page - 1) * page_size
-    result = await db.execute(students_query.offset(offset).limit(page_size))
-    students = result.scalars().all()
-
-    # Count total results
-    count_query = select(func.count(Student.id.distinct())).where(
-        or_(
-            Student.first_name.ilike(f"%{query}%"),
-            Student.last_name.ilike(f"%{query}%"),
-            Student.phone.ilike(f"%{query}%"),
-            Student.id.in_(all_student_ids) if all_student_ids else False
-        )
+    result = await db.execute(
+        select(Student, func.count().over().label("total"))
+        .where(search_filter)
+        .order_by(Student.id)
+        .offset(offset)
+        .limit(page_size)
     )
-    count_result = await db.execute(count_query)
-    total = count_result.scalar() or 0
+    rows = result.all()
+    students = [row[0] for row in rows]
+
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # Page past the end - no rows to carry the total
+        total = (await db.execute(select(func.count(Student.id)).where(search_filter))).scalar() or 0
+    else:
+        total = 0
 
     return DataResponse(
-        data=[StudentRead.model_validate(s) for s in students],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size if total > 0 else 0,
-        ),
+        data=_students_adapter.validate_python(students, from_attributes=True),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
 
 
@@ -118,6 +289,8 @@ async def get_students(
     include_archived: bool = Query(False, description="Include archived students (default: only non-ARCHIVED)"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page; when set, page is ignored and meta has no total"),
+    prefix: bool = Query(False, description="Match search from the start of first/last name instead of anywhere"),
 ):
     """
     Get all students with optional filters.
@@ -125,59 +298,58 @@ async def get_students(
     Default behavior:
     - Shows current year's students only
     - Excludes ARCHIVED students unless include_archived=true
+
+    Students are ordered by id. For deep pages prefer cursor over page:
+    OFFSET has to skip all earlier rows, cursor seeks straight to them.
     """
     from datetime import datetime as dt
     if archive_year is None:
         archive_year = dt.now().year
 
-    query = select(Student).where(Student.archive_year == archive_year)
+    filters = [Student.archive_year == archive_year]
 
     # Default: exclude ARCHIVED students
     if not include_archived:
-        query = query.where(Student.status != StudentStatus.ARCHIVED)
+        filters.append(Student.status != StudentStatus.ARCHIVED)
 
     if search:
-        query = query.where(
-            or_(
-                Student.first_name.ilike(f"%{search}%"),
-                Student.last_name.ilike(f"%{search}%"),
-            )
-        )
+        filters.append(or_(*_student_text_filters(search, prefix, with_phone=False)))
     if group_id:
-        query = query.where(Student.group_id == group_id)
+        filters.append(Student.group_id == group_id)
     if status:
-        query = query.where(Student.status == status)
+        filters.append(Student.status == status)
 
-    offset = (page - 1) * page_size
-    result = await db.execute(query.offset(offset).limit(page_size))
-    students = result.scalars().all()
+    # One extra row tells whether there is a next page
+    if cursor is not None:
+        query = select(Student).where(*filters, Student.id > decode_id_cursor(cursor))
+    else:
+        # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
+        query = select(Student, func.count().over().label("total")).where(*filters).offset((page - 1) * page_size)
 
-    count_query = select(func.count(Student.id)).where(Student.archive_year == archive_year)
-    if not include_archived:
-        count_query = count_query.where(Student.status != StudentStatus.ARCHIVED)
-    if search:
-        count_query = count_query.where(
-            or_(
-                Student.first_name.ilike(f"%{search}%"),
-                Student.last_name.ilike(f"%{search}%"),
-            )
-        )
-    if group_id:
-        count_query = count_query.where(Student.group_id == group_id)
-    if status:
-        count_query = count_query.where(Student.status == status)
+    result = await db.execute(query.order_by(Student.id).limit(page_size + 1))
+    rows = result.all()
+    students = [row[0] for row in rows]
+
+    next_cursor = None
+    if len(students) > page_size:
+        students = students[:page_size]
+        next_cursor = encode_id_cursor(students[-1].id)
 
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    if cursor is not None:
+        # Keyset pages skip the count: counting all filtered rows is what cursors avoid
+        meta = PaginationMeta.for_cursor(page_size, next_cursor)
+    else:
+        if rows:
+            total = rows[0].total
+        else:
+            # A page past the end has no rows to carry the window count
+            count_result = await db.execute(select(func.count(Student.id)).where(*filters))
+            total = count_result.scalar()
+        meta = PaginationMeta.for_page(page, page_size, total, next_cursor=next_cursor)
 
     return DataResponse(
-        data=[StudentRead.model_validate(s) for s in students],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        data=_students_adapter.validate_python(students, from_attributes=True),
+        meta=meta,
     )
 
 
@@ -211,10 +383,7 @@ async def get_unpaid_students(
     - /unpaid?year=2025 - Debtors for any month in 2025
     - /unpaid?year=2025&group_id=5 - Debtors in group 5 for 2025
     """
-    from app.models.domain import Contract
-    from app.models.enums import ContractStatus, PaymentStatus
     from datetime import date as date_type
-    from dateutil.relativedelta import relativedelta
 
     # Default to current year
     today = date_type.today()
@@ -236,12 +405,7 @@ async def get_unpaid_students(
             raise HTTPException(status_code=400, detail="from_date must be before or equal to to_date")
 
         # Calculate all months in the date range
-        current_date = from_date.replace(day=1)
-        end_date = to_date.replace(day=1)
-
-        while current_date <= end_date:
-            target_months.append((current_date.year, current_date.month))
-            current_date += relativedelta(months=1)
+        target_months = month_range(from_date, to_date)
     else:
         # Year/month mode (existing logic)
         target_year = year if year is not None else today.year
@@ -267,110 +431,57 @@ async def get_unpaid_students(
         # Convert to (year, month) tuples
         target_months = [(target_year, m) for m in month_list]
 
-    # Build student query with filters
-    students_query = select(Student).where(Student.status == "active")
-
-    if group_id:
-        students_query = students_query.where(Student.group_id == group_id)
-
-    students_result = await db.execute(students_query)
-    students = students_result.scalars().all()
+    cache_key = (tuple(target_months), group_id, page, page_size)
+    cached = unpaid_students_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    cache_version = unpaid_students_cache.version
 
-    debt_info_list = []
-    for student in students:
-        # Get all contracts for this student (including terminated ones)
-        contracts_result = await db.execute(
-            select(Contract).where(Contract.student_id == student.id)
+    # Expected and paid totals, sorting and pagination all happen in SQL;
+    # the total comes back on every row via a window count
+    offset = (page - 1) * page_size
+    debt_query = unpaid_students_query(target_months, group_id)
+    debt_rows = (
+        await db.execute(
+            debt_query.add_columns(func.count().over().label("total")).offset(offset).limit(page_size)
         )
-        contracts = contracts_result.scalars().all()
-
-        if not contracts:
-            continue
-
-        # Calculate debt across all target months
-        total_expected = 0
-        total_paid = 0
-        active_contracts_count = 0
-
-        for target_year_month, target_month_num in target_months:
-            # Calculate expected payment for this month
-            month_expected = 0
-            target_date = date_type(target_year_month, target_month_num, 1)
-
-            for contract in contracts:
-                # Determine the effective end date (earliest of end_date or terminated_at)
-                effective_end_date = contract.end_date
-                if contract.terminated_at:
-                    termination_date = contract.terminated_at.date()
-                    if termination_date < effective_end_date:
-                        effective_end_date = termination_date
-
-                # Check if contract was active during this target month
-                # Contract start month
-                contract_start_month = contract.start_date.replace(day=1)
-                contract_end_month = effective_end_date.replace(day=1)
-
-                # Check if target month falls within contract period
-                if contract_start_month <= target_date <= contract_end_month:
-                    month_expected += float(contract.monthly_fee)
-                    # Count as active if it was active in any of the target months
-                    if contract.status == ContractStatus.ACTIVE or (
-                        contract.status == ContractStatus.TERMINATED and
-                        contract.terminated_at and
-                        contract.terminated_at.date() >= target_date
-                    ):
-                        active_contracts_count = max(active_contracts_count, 1)
-
-            # Add to total expected
-            total_expected += month_expected
-
-            # Check if student has paid for this specific month
-            # Use PostgreSQL @> operator to check if JSON array contains the target month
-            # Cast payment_months to JSONB to avoid type mismatch
-            transactions_result = await db.execute(
-                select(func.sum(Transaction.amount)).where(
-                    Transaction.student_id == student.id,
-                    Transaction.status == PaymentStatus.SUCCESS,
-                    Transaction.payment_year == target_year_month,
-                    cast(Transaction.payment_months, JSONB).op('@>')(cast([target_month_num], JSONB))
-                )
-            )
-            month_paid = transactions_result.scalar() or 0
-            total_paid += float(month_paid)
-
-        # If no expected payment for any month, skip
-        if total_expected == 0:
-            continue
-
-        # Calculate total debt
-        debt_amount = total_expected - total_paid
-
-        if debt_amount > 0.01:  # Only include if debt > 1 cent (avoid floating point errors)
-            debt_info_list.append(StudentDebtInfo(
-                student=StudentRead.model_validate(student),
-                total_expected=total_expected,
-                total_paid=total_paid,
-                debt_amount=debt_amount,
-                active_contracts_count=len([c for c in contracts if c.status == ContractStatus.ACTIVE])
-            ))
+    ).all()
 
-    # Sort by debt amount (highest first)
-    debt_info_list.sort(key=lambda x: x.debt_amount, reverse=True)
+    if debt_rows:
+        total = debt_rows[0].total
+    elif offset:
+        # Page past the end - no rows to carry the total
+        total = (await db.execute(select(func.count()).select_from(debt_query.subquery()))).scalar() or 0
+    else:
+        total = 0
 
-    # Apply pagination
-    offset = (page - 1) * page_size
-    paginated_list = debt_info_list[offset:offset + page_size]
-    total = len(debt_info_list)
+    students_by_id = {}
+    if debt_rows:
+        students_result = await db.execute(
+            select(Student).where(Student.id.in_([row.student_id for row in debt_rows]))
+        )
+        students_by_id = {s.id: s for s in students_result.scalars().all()}
+
+    paginated_list = _debt_info_adapter.validate_python(
+        [
+            {
+                "student": students_by_id[row.student_id],
+                "total_expected": row.total_expected,
+                "total_paid": row.total_paid,
+                "debt_amount": row.debt_amount,
+                "active_contracts_count": row.active_contracts_count,
+            }
+            for row in debt_rows
+        ],
+        from_attributes=True,
+    )
 
-    return DataResponse(
+    response = DataResponse(
         data=paginated_list,
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
+    unpaid_students_cache.set(cache_key, response, version=cache_version)
+    return response
 
 
 @router.get("/unpaid/export", dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
@@ -394,10 +505,8 @@ async def export_unpaid_students(
     - to_date: End date for date range (e.g., "2025-03-31")
     - group_id: Filter by specific group
     """
-    from app.models.domain import Contract, Group
-    from app.models.enums import ContractStatus, PaymentStatus
+    from app.models.domain import Group
     from datetime import date as date_type
-    from dateutil.relativedelta import relativedelta
 
     # Default to current year
     today = date_type.today()
@@ -419,12 +528,7 @@ async def export_unpaid_students(
             raise HTTPException(status_code=400, detail="from_date must be before or equal to to_date")
 
         # Calculate all months in the date range
-        current_date = from_date.replace(day=1)
-        end_date = to_date.replace(day=1)
-
-        while current_date <= end_date:
-            target_months.append((current_date.year, current_date.month))
-            current_date += relativedelta(months=1)
+        target_months = month_range(from_date, to_date)
     else:
         # Year/month mode
         target_year = year if year is not None else today.year
@@ -445,14 +549,25 @@ async def export_unpaid_students(
 
         target_months = [(target_year, m) for m in month_list]
 
-    # Build student query with filters
-    students_query = select(Student).where(Student.status == "active")
-
-    if group_id:
-        students_query = students_query.where(Student.group_id == group_id)
-
-    students_result = await db.execute(students_query)
-    students = students_result.scalars().all()
+    # Expected and paid totals are aggregated in SQL (same query as /unpaid),
+    # rows come sorted by debt amount (highest first)
+    debt_rows = (await db.execute(unpaid_students_query(target_months, group_id))).all()
+
+    # Only the columns the report needs, as plain tuples instead of ORM objects
+    students_by_id = {}
+    if debt_rows:
+        students_result = await db.execute(
+            select(
+                Student.id,
+                Student.first_name,
+                Student.last_name,
+                Student.phone,
+                Group.name.label("group_name"),
+            )
+            .outerjoin(Group, Group.id == Student.group_id)
+            .where(Student.id.in_([row.student_id for row in debt_rows]))
+        )
+        students_by_id = {student.id: student for student in students_result.all()}
 
     # Get group name for filename if filtering by group
     group_name = ""
@@ -462,144 +577,48 @@ async def export_unpaid_students(
         if group:
             group_name = f"_{group.name.replace(' ', '_')}"
 
-    debt_info_list = []
-    for student in students:
-        contracts_result = await db.execute(
-            select(Contract).where(Contract.student_id == student.id)
-        )
-        contracts = contracts_result.scalars().all()
-
-        if not contracts:
-            continue
-
-        total_expected = 0
-        total_paid = 0
-
-        for target_year_month, target_month_num in target_months:
-            month_expected = 0
-            target_date = date_type(target_year_month, target_month_num, 1)
-
-            for contract in contracts:
-                effective_end_date = contract.end_date
-                if contract.terminated_at:
-                    termination_date = contract.terminated_at.date()
-                    if termination_date < effective_end_date:
-                        effective_end_date = termination_date
-
-                contract_start_month = contract.start_date.replace(day=1)
-                contract_end_month = effective_end_date.replace(day=1)
-
-                if contract_start_month <= target_date <= contract_end_month:
-                    month_expected += float(contract.monthly_fee)
-
-            total_expected += month_expected
-
-            # Cast payment_months to JSONB to avoid type mismatch
-            transactions_result = await db.execute(
-                select(func.sum(Transaction.amount)).where(
-                    Transaction.student_id == student.id,
-                    Transaction.status == PaymentStatus.SUCCESS,
-                    Transaction.payment_year == target_year_month,
-                    cast(Transaction.payment_months, JSONB).op('@>')(cast([target_month_num], JSONB))
-                )
-            )
-            month_paid = transactions_result.scalar() or 0
-            total_paid += float(month_paid)
-
-        if total_expected == 0:
-            continue
-
-        debt_amount = total_expected - total_paid
-
-        if debt_amount > 0.01:
-            # Get group name for this student
-            student_group_name = ""
-            if student.group_id:
-                student_group_result = await db.execute(select(Group).where(Group.id == student.group_id))
-                student_group = student_group_result.scalar_one_or_none()
-                if student_group:
-                    student_group_name = student_group.name
-
-            debt_info_list.append({
-                "student_id": student.id,
-                "first_name": student.first_name,
-                "last_name": student.last_name,
-                "phone": student.phone or "",
-                "group": student_group_name,
-                "total_expected": total_expected,
-                "total_paid": total_paid,
-                "debt_amount": debt_amount,
-                "active_contracts": len([c for c in contracts if c.status == ContractStatus.ACTIVE])
-            })
-
-    # Sort by debt amount (highest first)
-    debt_info_list.sort(key=lambda x: x["debt_amount"], reverse=True)
-
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Unpaid Students"
-
-    # Define header style
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=11)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # Define headers
-    headers = [
-        "ID",
-        "First Name",
-        "Last Name",
-        "Phone",
-        "Group",
-        "Expected Amount",
-        "Paid Amount",
-        "Debt Amount",
-        "Active Contracts"
-    ]
+    wb, ws = _new_export_sheet(
+        "Unpaid Students",
+        _UNPAID_HEADERS,
+        _UNPAID_WIDTHS,
+        Alignment(horizontal="center", vertical="center"),
+    )
 
-    # Write headers
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Write data
-    for row_num, debt_info in enumerate(debt_info_list, 2):
-        ws.cell(row=row_num, column=1, value=debt_info["student_id"])
-        ws.cell(row=row_num, column=2, value=debt_info["first_name"])
-        ws.cell(row=row_num, column=3, value=debt_info["last_name"])
-        ws.cell(row=row_num, column=4, value=debt_info["phone"])
-        ws.cell(row=row_num, column=5, value=debt_info["group"])
-        ws.cell(row=row_num, column=6, value=debt_info["total_expected"])
-        ws.cell(row=row_num, column=7, value=debt_info["total_paid"])
-        ws.cell(row=row_num, column=8, value=debt_info["debt_amount"])
-        ws.cell(row=row_num, column=9, value=debt_info["active_contracts"])
-
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 8
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 20
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 15
-    ws.column_dimensions['H'].width = 15
-    ws.column_dimensions['I'].width = 18
-
-    # Add summary row
-    if debt_info_list:
-        summary_row = len(debt_info_list) + 3
-        ws.cell(row=summary_row, column=1, value="TOTAL").font = Font(bold=True)
-        ws.cell(row=summary_row, column=6, value=sum(d["total_expected"] for d in debt_info_list)).font = Font(bold=True)
-        ws.cell(row=summary_row, column=7, value=sum(d["total_paid"] for d in debt_info_list)).font = Font(bold=True)
-        ws.cell(row=summary_row, column=8, value=sum(d["debt_amount"] for d in debt_info_list)).font = Font(bold=True)
-
-    # Save to BytesIO
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
+    # Write data, keeping running totals for the summary row
+    sum_expected = sum_paid = sum_debt = 0
+    for row in debt_rows:
+        student = students_by_id[row.student_id]
+        total_expected = float(row.total_expected)
+        total_paid = float(row.total_paid)
+        debt_amount = float(row.debt_amount)
+        sum_expected += total_expected
+        sum_paid += total_paid
+        sum_debt += debt_amount
+        ws.append((
+            student.id,
+            student.first_name,
+            student.last_name,
+            student.phone or "",
+            student.group_name or "",
+            total_expected,
+            total_paid,
+            debt_amount,
+            row.active_contracts_count,
+        ))
+
+    # Add summary row (after one empty row)
+    if debt_rows:
+        ws.append([])
+        ws.append([
+            _styled_cell(ws, "TOTAL", "total"),
+            None,
+            None,
+            None,
+            None,
+            _styled_cell(ws, sum_expected, "total"),
+            _styled_cell(ws, sum_paid, "total"),
+            _styled_cell(ws, sum_debt, "total"),
+        ])
 
     # Generate filename based on filter type
     if use_date_range:
@@ -611,12 +630,8 @@ async def export_unpaid_students(
         months_str = ",".join(map(str, month_nums)) if len(month_nums) <= 3 else "all"
         filename = f"unpaid_students_{target_year}_{months_str}{group_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    # Return as streaming response
-    return StreamingResponse(
-        excel_file,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    # Save to a temporary file and send it from disk
+    return await _workbook_response(wb, filename)
 
 
 @router.get("/comprehensive-export", dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
@@ -644,7 +659,6 @@ async def export_comprehensive_student_data(
     from app.models.domain import Contract, Group, Parent
     from app.models.enums import ContractStatus, PaymentStatus
     from datetime import date as date_type
-    from dateutil.relativedelta import relativedelta
     from sqlalchemy.orm import selectinload
 
     # Default date range
@@ -657,35 +671,82 @@ async def export_comprehensive_student_data(
     if from_date > to_date:
         raise HTTPException(status_code=400, detail="from_date must be before or equal to to_date")
 
-    # Calculate all months in the date range
-    all_months = []
-    current_date = from_date.replace(day=1)
-    end_date = to_date.replace(day=1)
-
-    while current_date <= end_date:
-        all_months.append((current_date.year, current_date.month))
-        current_date += relativedelta(months=1)
+    # Calculate all months in the date range once: (year, month, year*12+month key, "YYYY-MM" label)
+    all_months = month_range(from_date, to_date)
+    target_months = [(y, m, y * 12 + m, f"{y}-{m:02d}") for y, m in all_months]
 
     # Build student query with filters
+    student_filters = []
+    if group_id:
+        student_filters.append(Student.group_id == group_id)
+
+    if status:
+        student_filters.append(Student.status == status)
+
+    # Related rows are batch-loaded, never per student: parents and contracts come
+    # from one IN query each per streamed batch, group names from one query up front
+    group_names = dict((await db.execute(
+        select(Group.id, Group.name).where(Group.id.in_(select(Student.group_id).where(*student_filters)))
+    )).all())
+
     students_query = select(Student).options(
-        selectinload(Student.group),
-        selectinload(Student.parents),
+        selectinload(Student.parents).load_only(Parent.first_name, Parent.last_name, Parent.phone),
         selectinload(Student.contracts)
+    ).where(*student_filters).order_by(Student.id)
+
+    # Paid amounts for every (student, contract, year, month) in one grouped query:
+    # payment_months is unnested, rows are de-duplicated per transaction, then summed
+    payment_month = cast(func.jsonb_array_elements_text(Transaction.payment_months), Integer).label("month")
+    paid_rows = (
+        select(
+            Transaction.id,
+            Transaction.student_id,
+            Transaction.contract_id,
+            Transaction.payment_year,
+            Transaction.amount,
+            payment_month,
+        )
+        .where(
+            Transaction.student_id.in_(select(Student.id).where(*student_filters)),
+            Transaction.status == PaymentStatus.SUCCESS,
+            Transaction.payment_year.in_({y for y, _ in all_months}),
+            func.jsonb_typeof(Transaction.payment_months) == "array",
+        )
+        .distinct()
+        .subquery()
     )
+    paid_result = await db.execute(
+        select(
+            paid_rows.c.student_id,
+            paid_rows.c.contract_id,
+            paid_rows.c.payment_year,
+            paid_rows.c.month,
+            func.sum(paid_rows.c.amount),
+        ).group_by(paid_rows.c.student_id, paid_rows.c.contract_id, paid_rows.c.payment_year, paid_rows.c.month)
+    )
+    paid_by_month = {
+        (student_id, contract_id, payment_year, month): paid
+        for student_id, contract_id, payment_year, month, paid in paid_result.all()
+    }
 
-    if group_id:
-        students_query = students_query.where(Student.group_id == group_id)
+    # Students are streamed in batches (parents/contracts selectin-loaded per
+    # batch), so they are never all in memory at once
+    students = await db.stream_scalars(students_query.execution_options(yield_per=_EXPORT_BATCH_SIZE))
 
-    if status:
-        students_query = students_query.where(Student.status == status)
+    wb, ws = _new_export_sheet(
+        "Student Data",
+        _COMPREHENSIVE_HEADERS,
+        _COMPREHENSIVE_WIDTHS,
+        Alignment(horizontal="center", vertical="center", wrap_text=True),
+    )
 
-    students_result = await db.execute(students_query)
-    students = students_result.scalars().all()
+    # Rows are written as they are built; summary totals are kept as running counters
+    sum_expected = sum_paid = sum_debt = _ZERO
+    student_count = contract_rows = 0
 
-    # Prepare data for Excel
-    student_data_list = []
+    async for student in students:
+        student_count += 1
 
-    for student in students:
         # Get all contracts for this student
         contracts = student.contracts
 
@@ -694,210 +755,102 @@ async def export_comprehensive_student_data(
         parent_phones = ", ".join([p.phone for p in student.parents]) if student.parents else "N/A"
 
         # Get group name
-        group_name = student.group.name if student.group else "N/A"
+        group_name = group_names.get(student.group_id, "N/A")
+
+        # Columns shared by every row of this student
+        student_columns = (
+            student.id,
+            student.first_name,
+            student.last_name,
+            student.date_of_birth.strftime("%Y-%m-%d"),
+            student.phone or "N/A",
+            student.address or "N/A",
+            student.status.value,
+            group_name,
+            parent_names,
+            parent_phones,
+        )
 
         # Process each contract
         if not contracts:
             # Student without contracts
-            student_data_list.append({
-                "student_id": student.id,
-                "first_name": student.first_name,
-                "last_name": student.last_name,
-                "date_of_birth": student.date_of_birth.strftime("%Y-%m-%d"),
-                "phone": student.phone or "N/A",
-                "address": student.address or "N/A",
-                "status": student.status.value,
-                "group": group_name,
-                "parent_names": parent_names,
-                "parent_phones": parent_phones,
-                "contract_number": "N/A",
-                "contract_start": "N/A",
-                "contract_end": "N/A",
-                "contract_status": "N/A",
-                "monthly_fee": 0,
-                "terminated_at": "N/A",
-                "termination_reason": "N/A",
-                "paid_months": "N/A",
-                "unpaid_months": "N/A",
-                "total_expected": 0,
-                "total_paid": 0,
-                "debt_amount": 0,
-            })
+            ws.append(student_columns + ("N/A", "N/A", "N/A", "N/A", 0, "N/A", "N/A", "N/A", "N/A", 0, 0, 0))
+            contract_rows += 1
         else:
             for contract in contracts:
-                # Calculate payment status for this contract
-                total_expected = 0
-                total_paid = 0
+                # Calculate payment status for this contract.
+                # Amounts stay Decimal (as stored) and are converted to float once per row.
+                total_expected = total_paid = _ZERO
                 paid_months_list = []
                 unpaid_months_list = []
 
-                for year_val, month_val in all_months:
-                    target_date = date_type(year_val, month_val, 1)
-
-                    # Check if this month falls within the contract period
-                    effective_end_date = contract.end_date
-                    if contract.terminated_at:
-                        termination_date = contract.terminated_at.date()
-                        if termination_date < effective_end_date:
-                            effective_end_date = termination_date
+                # Contract period bounds don't depend on the month - compute them once
+                effective_end_date = contract.end_date
+                if contract.terminated_at:
+                    termination_date = contract.terminated_at.date()
+                    if termination_date < effective_end_date:
+                        effective_end_date = termination_date
 
-                    contract_start_month = contract.start_date.replace(day=1)
-                    contract_end_month = effective_end_date.replace(day=1)
+                contract_start_key = contract.start_date.year * 12 + contract.start_date.month
+                contract_end_key = effective_end_date.year * 12 + effective_end_date.month
+                monthly_fee = contract.monthly_fee
 
-                    if contract_start_month <= target_date <= contract_end_month:
+                for year_val, month_val, month_key, month_str in target_months:
+                    # Check if this month falls within the contract period
+                    if contract_start_key <= month_key <= contract_end_key:
                         # Month is within contract period
-                        total_expected += float(contract.monthly_fee)
+                        total_expected += monthly_fee
 
                         # Check if student has paid for this month
-                        # Cast payment_months to JSONB to avoid type mismatch
-                        payment_result = await db.execute(
-                            select(func.sum(Transaction.amount)).where(
-                                Transaction.student_id == student.id,
-                                Transaction.contract_id == contract.id,
-                                Transaction.status == PaymentStatus.SUCCESS,
-                                Transaction.payment_year == year_val,
-                                cast(Transaction.payment_months, JSONB).op('@>')(cast([month_val], JSONB))
-                            )
-                        )
-                        month_paid = payment_result.scalar() or 0
-
-                        month_str = f"{year_val}-{month_val:02d}"
-                        if month_paid >= contract.monthly_fee:
+                        month_paid = paid_by_month.get((student.id, contract.id, year_val, month_val), _ZERO)
+
+                        total_paid += month_paid
+                        if month_paid >= monthly_fee:
                             paid_months_list.append(month_str)
-                            total_paid += float(month_paid)
                         else:
                             unpaid_months_list.append(month_str)
-                            total_paid += float(month_paid)
 
-                debt_amount = max(total_expected - total_paid, 0)
+                debt_amount = max(total_expected - total_paid, _ZERO)
 
                 # Format termination info
                 terminated_at_str = contract.terminated_at.strftime("%Y-%m-%d") if contract.terminated_at else "N/A"
                 termination_reason = contract.termination_reason if contract.termination_reason else "N/A"
 
-                student_data_list.append({
-                    "student_id": student.id,
-                    "first_name": student.first_name,
-                    "last_name": student.last_name,
-                    "date_of_birth": student.date_of_birth.strftime("%Y-%m-%d"),
-                    "phone": student.phone or "N/A",
-                    "address": student.address or "N/A",
-                    "status": student.status.value,
-                    "group": group_name,
-                    "parent_names": parent_names,
-                    "parent_phones": parent_phones,
-                    "contract_number": contract.contract_number or "N/A",
-                    "contract_start": contract.start_date.strftime("%Y-%m-%d"),
-                    "contract_end": contract.end_date.strftime("%Y-%m-%d"),
-                    "contract_status": contract.status.value,
-                    "monthly_fee": float(contract.monthly_fee),
-                    "terminated_at": terminated_at_str,
-                    "termination_reason": termination_reason,
-                    "paid_months": ", ".join(paid_months_list) if paid_months_list else "None",
-                    "unpaid_months": ", ".join(unpaid_months_list) if unpaid_months_list else "None",
-                    "total_expected": total_expected,
-                    "total_paid": total_paid,
-                    "debt_amount": debt_amount,
-                })
-
-    # Create Excel workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Student Data"
-
-    # Define header style
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=11)
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    # Define headers
-    headers = [
-        "Student ID",
-        "First Name",
-        "Last Name",
-        "Date of Birth",
-        "Phone",
-        "Address",
-        "Status",
-        "Group",
-        "Parent Names",
-        "Parent Phones",
-        "Contract Number",
-        "Contract Start",
-        "Contract End",
-        "Contract Status",
-        "Monthly Fee",
-        "Terminated At",
-        "Termination Reason",
-        "Paid Months",
-        "Unpaid Months",
-        "Total Expected",
-        "Total Paid",
-        "Debt Amount",
-    ]
-
-    # Write headers
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Write data
-    for row_num, student_data in enumerate(student_data_list, 2):
-        ws.cell(row=row_num, column=1, value=student_data["student_id"])
-        ws.cell(row=row_num, column=2, value=student_data["first_name"])
-        ws.cell(row=row_num, column=3, value=student_data["last_name"])
-        ws.cell(row=row_num, column=4, value=student_data["date_of_birth"])
-        ws.cell(row=row_num, column=5, value=student_data["phone"])
-        ws.cell(row=row_num, column=6, value=student_data["address"])
-        ws.cell(row=row_num, column=7, value=student_data["status"])
-        ws.cell(row=row_num, column=8, value=student_data["group"])
-        ws.cell(row=row_num, column=9, value=student_data["parent_names"])
-        ws.cell(row=row_num, column=10, value=student_data["parent_phones"])
-        ws.cell(row=row_num, column=11, value=student_data["contract_number"])
-        ws.cell(row=row_num, column=12, value=student_data["contract_start"])
-        ws.cell(row=row_num, column=13, value=student_data["contract_end"])
-        ws.cell(row=row_num, column=14, value=student_data["contract_status"])
-        ws.cell(row=row_num, column=15, value=student_data["monthly_fee"])
-        ws.cell(row=row_num, column=16, value=student_data["terminated_at"])
-        ws.cell(row=row_num, column=17, value=student_data["termination_reason"])
-        ws.cell(row=row_num, column=18, value=student_data["paid_months"])
-        ws.cell(row=row_num, column=19, value=student_data["unpaid_months"])
-        ws.cell(row=row_num, column=20, value=student_data["total_expected"])
-        ws.cell(row=row_num, column=21, value=student_data["total_paid"])
-        ws.cell(row=row_num, column=22, value=student_data["debt_amount"])
-
-    # Adjust column widths
-    column_widths = {
-        'A': 12, 'B': 15, 'C': 15, 'D': 15, 'E': 15, 'F': 30,
-        'G': 12, 'H': 20, 'I': 25, 'J': 20, 'K': 18, 'L': 15,
-        'M': 15, 'N': 15, 'O': 12, 'P': 15, 'Q': 20, 'R': 50,
-        'S': 50, 'T': 15, 'U': 15, 'V': 15
-    }
-
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
-
-    # Add summary row
-    if student_data_list:
-        summary_row = len(student_data_list) + 3
-        ws.cell(row=summary_row, column=1, value="TOTALS").font = Font(bold=True)
-        ws.cell(row=summary_row, column=20, value=sum(d["total_expected"] for d in student_data_list)).font = Font(bold=True)
-        ws.cell(row=summary_row, column=21, value=sum(d["total_paid"] for d in student_data_list)).font = Font(bold=True)
-        ws.cell(row=summary_row, column=22, value=sum(d["debt_amount"] for d in student_data_list)).font = Font(bold=True)
-
-        # Add metadata
-        metadata_row = summary_row + 2
-        ws.cell(row=metadata_row, column=1, value=f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}").font = Font(italic=True)
-        ws.cell(row=metadata_row + 1, column=1, value=f"Period: {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}").font = Font(italic=True)
-        ws.cell(row=metadata_row + 2, column=1, value=f"Total Students: {len(set(d['student_id'] for d in student_data_list))}").font = Font(italic=True)
-        ws.cell(row=metadata_row + 3, column=1, value=f"Total Contracts: {len(student_data_list)}").font = Font(italic=True)
-
-    # Save to BytesIO
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
+                ws.append(student_columns + (
+                    contract.contract_number or "N/A",
+                    contract.start_date.strftime("%Y-%m-%d"),
+                    contract.end_date.strftime("%Y-%m-%d"),
+                    contract.status.value,
+                    float(monthly_fee),
+                    terminated_at_str,
+                    termination_reason,
+                    ", ".join(paid_months_list) if paid_months_list else "None",
+                    ", ".join(unpaid_months_list) if unpaid_months_list else "None",
+                    float(total_expected),
+                    float(total_paid),
+                    float(debt_amount),
+                ))
+                contract_rows += 1
+                sum_expected += total_expected
+                sum_paid += total_paid
+                sum_debt += debt_amount
+
+    # Add summary row (after one empty row)
+    if contract_rows:
+        summary = [None] * len(_COMPREHENSIVE_HEADERS)
+        summary[0] = _styled_cell(ws, "TOTALS", "total")
+        summary[19] = _styled_cell(ws, float(sum_expected), "total")
+        summary[20] = _styled_cell(ws, float(sum_paid), "total")
+        summary[21] = _styled_cell(ws, float(sum_debt), "total")
+        ws.append([])
+        ws.append(summary)
+
+        # Add metadata (every student has at least one row)
+        ws.append([])
+        ws.append([_styled_cell(ws, f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "note")])
+        ws.append([_styled_cell(ws, f"Period: {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}", "note")])
+        ws.append([_styled_cell(ws, f"Total Students: {student_count}", "note")])
+        ws.append([_styled_cell(ws, f"Total Contracts: {contract_rows}", "note")])
 
     # Generate filename
     group_suffix = f"_group{group_id}" if group_id else ""
@@ -905,12 +858,8 @@ async def export_comprehensive_student_data(
     date_str = f"{from_date.strftime('%Y%m%d')}_{to_date.strftime('%Y%m%d')}"
     filename = f"comprehensive_student_data_{date_str}{group_suffix}{status_suffix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-    # Return as streaming response
-    return StreamingResponse(
-        excel_file,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    # Save to a temporary file and send it from disk
+    return await _workbook_response(wb, filename)
 
 
 @router.post("", response_model=DataResponse[StudentRead], dependencies=[Depends(require_permission(PERM_STUDENTS_EDIT))])
@@ -919,8 +868,7 @@ async def create_student(
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     if data.face_id:
-        existing_face_id = await db.execute(select(Student).where(Student.face_id == data.face_id))
-        if existing_face_id.scalar_one_or_none():
+        if await existing_face_ids(db, [data.face_id]):
             raise HTTPException(status_code=400, detail="Face ID already exists. Please use a unique Face ID")
 
     if data.group_id:
@@ -949,19 +897,32 @@ async def create_student(
 
     student = Student(**data.model_dump())
     db.add(student)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request took the same face_id after the check above
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Face ID already exists. Please use a unique Face ID")
     await db.refresh(student)
     return DataResponse(data=StudentRead.model_validate(student))
 
 from dateutil.relativedelta import relativedelta
-from decimal import Decimal, InvalidOperation
+from decimal import InvalidOperation
 from fastapi import HTTPException
 import asyncio
 
-@router.post("/create-with-contract")
+# Month names printed in the contract date ("sana") line
+_CONTRACT_MONTHS = {
+    1: "январь", 2: "февраль", 3: "март", 4: "апрель",
+    5: "май", 6: "июнь", 7: "июль", 8: "август",
+    9: "сентябрь", 10: "октябрь", 11: "ноябрь", 12: "декабрь"
+}
+
+@router.post("/create-with-contract", status_code=202)
 async def create_student_with_contract(
     user: Annotated[User, Depends(require_permission(PERM_STUDENTS_EDIT))],
     db: Annotated[AsyncSession, Depends(get_db)],
+    background_tasks: BackgroundTasks,
 
     # ========== JSON DATA ==========
     student_data: str = Form(..., description="Student data as JSON"),
@@ -1053,8 +1014,9 @@ async def create_student_with_contract(
     1. Parse JSON data from student_data and contract_data
     2. Upload 9 files to AWS S3 automatically
     3. Create student and contract with ACTIVE status
-    4. Generate PDF contract using contractdoc.py logic
-    5. Return generated PDF file
+    4. Return 202 with contract_id, pdf_status "pending" and pdf_url
+    5. PDF contract is generated in the background; GET /contracts/{contract_id}/pdf
+       returns 404 until it is ready, then redirects to the PDF
     """
     from app.models.domain import Group, Contract, WaitingList
     from app.models.enums import ContractStatus, StudentStatus
@@ -1064,8 +1026,6 @@ async def create_student_with_contract(
         validate_contract_number
     )
     import json
-    import os
-    import tempfile
     from datetime import datetime
 
     # Parse JSON data
@@ -1090,18 +1050,6 @@ async def create_student_with_contract(
             status_code=400,
             detail="Missing required fields in student_data: first_name, last_name, date_of_birth, group_id"
         )
-    contract_images_urls = []
-    if contract_image_1:
-        contract_images_urls.append(await upload_image_to_s3(contract_image_1, "contracts"))
-    if contract_image_2:
-        contract_images_urls.append(await upload_image_to_s3(contract_image_2, "contracts"))
-    if contract_image_3:
-        contract_images_urls.append(await upload_image_to_s3(contract_image_3, "contracts"))
-    if contract_image_4:
-        contract_images_urls.append(await upload_image_to_s3(contract_image_4, "contracts"))
-    if contract_image_5:
-        contract_images_urls.append(await upload_image_to_s3(contract_image_5, "contracts"))
-
     # Extract contract fields
     buyurtmachi = contract_info.get("buyurtmachi", {})
     studentInfo=contract_info.get("student", {})
@@ -1118,8 +1066,7 @@ async def create_student_with_contract(
         )
 
     # Validate group exists and get birth_year from group
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
@@ -1136,46 +1083,29 @@ async def create_student_with_contract(
             detail=f"Group '{group.name}' is full (capacity: {group.capacity}). Cannot create contract. Add to waiting list instead."
         )
 
-    # Upload all files to S3
-    # Upload all files to S3
+    # Upload all files to S3 concurrently (conversion + upload run in the threadpool)
     try:
-        # Fayl pointerlarini qayta boshiga olish
-        for f in [passport_copy, form_086, heart_checkup, birth_certificate, contract_image_1, contract_image_2, contract_image_3, contract_image_4, contract_image_5]:
-            if f is not None:
-                f.file.seek(0)
-
-        # Asosiy hujjatlar
-        passport_copy_url = await upload_image_to_s3(passport_copy, "student-documents")  # Profile image
-        form_086_url = await upload_image_to_s3(form_086, "student-documents")
-        heart_checkup_url = await upload_image_to_s3(heart_checkup, "student-documents")
-        birth_certificate_url = await upload_image_to_s3(birth_certificate, "student-documents")
-
-        # Contract images (passports)
-        contract_images_urls = []
-        # Index 0: birth certificate back (optional)
-        if contract_image_1:
-            contract_images_urls.append(await upload_image_to_s3(contract_image_1, "contracts"))
-        else:
-            contract_images_urls.append(None)
-
-        # Index 1: father passport front (mandatory)
-        contract_images_urls.append(await upload_image_to_s3(contract_image_2, "contracts"))
-
-        # Index 2: father passport back (optional)
-        if contract_image_3:
-            contract_images_urls.append(await upload_image_to_s3(contract_image_3, "contracts"))
-        else:
-            contract_images_urls.append(None)
-
-        # Index 3: mother passport front (mandatory)
-        contract_images_urls.append(await upload_image_to_s3(contract_image_4, "contracts"))
-
-        # Index 4: mother passport back (optional)
-        if contract_image_5:
-            contract_images_urls.append(await upload_image_to_s3(contract_image_5, "contracts"))
-        else:
-            contract_images_urls.append(None)
-
+        (
+            passport_copy_url,  # Profile image
+            form_086_url,
+            heart_checkup_url,
+            birth_certificate_url,
+            *contract_images_urls,
+        ) = await asyncio.gather(
+            # Asosiy hujjatlar
+            upload_image_to_s3(passport_copy, "student-documents"),
+            upload_image_to_s3(form_086, "student-documents"),
+            upload_image_to_s3(heart_checkup, "student-documents"),
+            upload_image_to_s3(birth_certificate, "student-documents"),
+            # Contract images (passports), fixed positions - optional ones upload as None:
+            # 0: birth certificate back, 1: father passport front, 2: father passport back,
+            # 3: mother passport front, 4: mother passport back
+            upload_image_to_s3(contract_image_1, "contracts"),
+            upload_image_to_s3(contract_image_2, "contracts"),
+            upload_image_to_s3(contract_image_3, "contracts"),
+            upload_image_to_s3(contract_image_4, "contracts"),
+            upload_image_to_s3(contract_image_5, "contracts"),
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading files to S3: {str(e)}")
@@ -1201,8 +1131,9 @@ async def create_student_with_contract(
         archive_year=current_year  # Set current year as archive year
     )
     db.add(student)
-    await db.commit()
-    await db.refresh(student)
+    # Student and contract are committed together at the end; flush only assigns student.id.
+    # Any HTTPException raised before that commit leaves nothing behind (the session rolls back).
+    await db.flush()
 
     # Validate the contract number provided by admin
     is_valid, message, sequence_number = await validate_contract_number(
@@ -1210,10 +1141,7 @@ async def create_student_with_contract(
     )
 
     if not is_valid:
-        # Rollback student creation if contract number is invalid
         await db.rollback()
-        await db.delete(student)
-        await db.commit()
         raise HTTPException(
             status_code=400,
             detail=f"Invalid contract number: {message}. Use GET /contracts/next-available/{group_id} to get the next available number."
@@ -1266,56 +1194,50 @@ async def create_student_with_contract(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Sana formati noto‘g‘ri (tugash): {str(e)}")
 
-    # Convert data to JSON strings for storage
-    contract_images_json_str = json.dumps(contract_images_urls)
-    custom_fields_json_str = json.dumps(contract_info, ensure_ascii=False, default=str)
-    existing_contract = await db.execute(
-        select(Contract).where(Contract.contract_number == contract_number)
-    )
-    if existing_contract.scalar():
+    # Create contract in ACTIVE status (no signature needed).
+    # The unique contract_number index does the duplicate check: no row is returned on conflict.
+    contract_id = (await db.execute(
+        pg_insert(Contract).values(
+            contract_number=contract_number,
+            birth_year=birth_year,
+            sequence_number=sequence_number,
+            start_date=start_date,
+            end_date=end_date,
+            monthly_fee=monthly_fee,
+            status=ContractStatus.ACTIVE,
+            student_id=student.id,
+            group_id=group_id,
+            archive_year=current_year,  # Set current year as archive year
+            passport_copy_url=passport_copy_url,
+            form_086_url=form_086_url,
+            heart_checkup_url=heart_checkup_url,
+            birth_certificate_url=birth_certificate_url,
+            contract_images_urls=contract_images_urls,
+            custom_fields=contract_info
+        )
+        .on_conflict_do_nothing(index_elements=[Contract.contract_number])
+        .returning(Contract.id)
+    )).scalar_one_or_none()
+    if contract_id is None:
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Shartnoma raqami '{contract_number}' allaqachon mavjud."
         )
-    # Create contract in ACTIVE status (no signature needed)
-    contract = Contract(
-        contract_number=contract_number,
-        birth_year=birth_year,
-        sequence_number=sequence_number,
-        start_date=start_date,
-        end_date=end_date,
-        monthly_fee=monthly_fee,
-        status=ContractStatus.ACTIVE,
-        student_id=student.id,
-        group_id=group_id,
-        archive_year=current_year,  # Set current year as archive year
-        passport_copy_url=passport_copy_url,
-        form_086_url=form_086_url,
-        heart_checkup_url=heart_checkup_url,
-        birth_certificate_url=birth_certificate_url,
-        contract_images_urls=contract_images_json_str,
-        custom_fields=custom_fields_json_str
-    )
+    mark_debt_changed(db)
 
-    db.add(contract)
     await db.commit()
-    await db.refresh(contract)
 
     # Prepare data for PDF generation (contractdoc.py format)
     # Parse sana from start_date
     sana_obj = start_date
-    months_uz = {
-        1: "январь", 2: "февраль", 3: "март", 4: "апрель",
-        5: "май", 6: "июнь", 7: "июль", 8: "август",
-        9: "сентябрь", 10: "октябрь", 11: "ноябрь", 12: "декабрь"
-    }
 
     pdf_data = {
         "shartnoma_raqami": contract_number,
         "student": contract_info.get("student", {}),
         "sana": {
             "kun": f"{sana_obj.day:02d}",
-            "oy": months_uz.get(sana_obj.month, ""),
+            "oy": _CONTRACT_MONTHS.get(sana_obj.month, ""),
             "yil": str(sana_obj.year)
         },
         "buyurtmachi": buyurtmachi,
@@ -1326,75 +1248,31 @@ async def create_student_with_contract(
             "yil": str(start_date.year)
         },
         "tolov": {
-            "oylik_narx": f"{monthly_fee:,.0f}".replace(",", " "),
+            "oylik_narx": format_amount(monthly_fee),
             "oylik_narx_sozlar": "sum"  # You can add number-to-words conversion here
         }
     }
     # passport_copy ni profile image sifatida ishlatamiz
     pdf_data["student"]["student_image"] = passport_copy_url
 
-    # Generate PDF with attachments (images at the end)
-    import time
-
-    temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    pdf_path = temp_pdf.name
-    temp_pdf.close()
-
-    try:
-        # Add URLs to pdf_data for contract_pdf.py to use
-        pdf_data["passport_copy_url"] = passport_copy_url
-        pdf_data["form_086_url"] = form_086_url
-        pdf_data["heart_checkup_url"] = heart_checkup_url
-        pdf_data["birth_certificate_url"] = birth_certificate_url
-        pdf_data["contract_images_urls"] = contract_images_urls
-
-        generator = ContractPDFGenerator(pdf_data)
+    # Add URLs to pdf_data for contract_pdf.py to use
+    pdf_data["passport_copy_url"] = passport_copy_url
+    pdf_data["form_086_url"] = form_086_url
+    pdf_data["heart_checkup_url"] = heart_checkup_url
+    pdf_data["birth_certificate_url"] = birth_certificate_url
+    pdf_data["contract_images_urls"] = contract_images_urls
 
-        # Generate PDF with all attachments (contract_pdf.py handles ordering)
-        final_pdf_path = generator.generate(pdf_path)
-
-        # Check if generation was successful
-        if not final_pdf_path or not isinstance(final_pdf_path, (str, os.PathLike)):
-            raise ValueError(f"PDF generation failed: {type(final_pdf_path)}")
-
-        # Upload final PDF to S3
-        pdf_s3_url = upload_pdf_to_s3(final_pdf_path, contract_number)
-
-        # Update contract with PDF URL
-        contract.final_pdf_url = pdf_s3_url
-        await db.commit()
-
-        # Clean up temp files
-        try:
-            time.sleep(0.2)
-            if os.path.exists(pdf_path):
-                os.unlink(pdf_path)
-            if os.path.exists(final_pdf_path):
-                os.unlink(final_pdf_path)
-        except:
-            pass
-
-        # Return success response with contract and PDF URL
-        return DataResponse(data={
-            "message": "Student and contract created successfully",
-            "student_id": student.id,
-            "contract_id": contract.id,
-            "contract_number": contract_number,
-            "pdf_url": pdf_s3_url
-        })
-
-    except Exception as e:
-        # Clean up temp files on error
-        try:
-            time.sleep(0.2)
-            if os.path.exists(pdf_path):
-                os.unlink(pdf_path)
-            if 'final_pdf_path' in locals() and os.path.exists(final_pdf_path):
-                os.unlink(final_pdf_path)
-        except:
-            pass
+    # PDF is rendered after the response is sent (see app.services.contract_pdf)
+    background_tasks.add_task(render_contract_pdf, contract_id, contract_number, pdf_data)
 
-        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+    return DataResponse(data={
+        "message": "Student and contract created successfully",
+        "student_id": student.id,
+        "contract_id": contract_id,
+        "contract_number": contract_number,
+        "pdf_status": "pending",
+        "pdf_url": f"/contracts/{contract_id}/pdf"
+    })
 
 
 @router.get("/{student_id}", response_model=DataResponse[StudentRead], dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
@@ -1426,49 +1304,37 @@ async def get_student_full_info(
     - Payment history (transactions)
     - Attendance records
     """
-    from app.models.domain import Contract, Parent, Group
-    from app.models.auth import User
-    from sqlalchemy.orm import selectinload
-
-    # Fetch student
-    student_result = await db.execute(select(Student).where(Student.id == student_id))
-    student = student_result.scalar_one_or_none()
+    from app.models.domain import Contract, Group
+    from sqlalchemy.orm import selectinload, joinedload
+
+    # Student (group + coach joined in, parents and contracts eager-loaded) on the
+    # request session; transactions and attendances on their own sessions in parallel
+    student_result, transactions, attendances = await asyncio.gather(
+        db.execute(
+            select(Student)
+            .options(
+                joinedload(Student.group).joinedload(Group.coach),
+                selectinload(Student.parents),
+                selectinload(Student.contracts).selectinload(Contract.terminated_by),
+            )
+            .where(Student.id == student_id)
+        ),
+        _scalars_in_own_session(
+            select(Transaction).where(Transaction.student_id == student_id).order_by(Transaction.created_at.desc())
+        ),
+        _scalars_in_own_session(
+            select(Attendance).where(Attendance.student_id == student_id).order_by(Attendance.created_at.desc())
+        ),
+    )
+    student = student_result.unique().scalar_one_or_none()
 
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    # Fetch parents
-    parents_result = await db.execute(select(Parent).where(Parent.student_id == student_id))
-    parents = parents_result.scalars().all()
-
-    # Fetch contracts
-    contracts_result = await db.execute(select(Contract).where(Contract.student_id == student_id))
-    contracts = contracts_result.scalars().all()
-
-    # Fetch group and coach if student has a group
-    group = None
-    coach = None
-    if student.group_id:
-        group_result = await db.execute(select(Group).where(Group.id == student.group_id))
-        group = group_result.scalar_one_or_none()
-
-        if group and group.coach_id:
-            coach_result = await db.execute(
-                select(User).where(User.id == group.coach_id)
-            )
-            coach = coach_result.scalar_one_or_none()
-
-    # Fetch transactions
-    transactions_result = await db.execute(
-        select(Transaction).where(Transaction.student_id == student_id).order_by(Transaction.created_at.desc())
-    )
-    transactions = transactions_result.scalars().all()
-
-    # Fetch attendance records
-    attendances_result = await db.execute(
-        select(Attendance).where(Attendance.student_id == student_id).order_by(Attendance.created_at.desc())
-    )
-    attendances = attendances_result.scalars().all()
+    parents = student.parents
+    contracts = student.contracts
+    group = student.group
+    coach = group.coach if group else None
 
     # Calculate total payments (only SUCCESS status)
     from app.models.enums import PaymentStatus, ContractStatus
@@ -1521,10 +1387,7 @@ async def update_student(
             )
 
     if "face_id" in update_data and update_data["face_id"] is not None:
-        existing_face_id = await db.execute(
-            select(Student).where(Student.face_id == update_data["face_id"], Student.id != student_id)
-        )
-        if existing_face_id.scalar_one_or_none():
+        if await existing_face_ids(db, [update_data["face_id"]], exclude_student_id=student_id):
             raise HTTPException(status_code=400, detail="Face ID already exists. Please use a unique Face ID")
 
     # Check capacity when assigning to a group or changing status to ACTIVE
@@ -1540,23 +1403,25 @@ async def update_student(
 
     if will_be_active_in_group:
         from app.models.domain import Group
-        group_result = await db.execute(select(Group).where(Group.id == target_group_id))
-        group = group_result.scalar_one_or_none()
-
-        if not group:
-            raise HTTPException(status_code=404, detail=f"Group with ID {target_group_id} not found")
-
-        # Count current ACTIVE students in target group (excluding this student)
-        active_students_count = await db.execute(
-            select(func.count(Student.id)).where(
-                Student.group_id == target_group_id,
+        # Group capacity and its current ACTIVE students (excluding this student) in one query
+        active_count = (
+            select(func.count(Student.id))
+            .where(
+                Student.group_id == Group.id,
                 Student.status == StudentStatus.ACTIVE,
                 Student.id != student_id  # Exclude current student from count
             )
+            .scalar_subquery()
         )
-        current_count = active_students_count.scalar() or 0
+        group_result = await db.execute(
+            select(Group.name, Group.capacity, active_count.label("active_count")).where(Group.id == target_group_id)
+        )
+        group = group_result.one_or_none()
 
-        if current_count >= group.capacity:
+        if not group:
+            raise HTTPException(status_code=404, detail=f"Group with ID {target_group_id} not found")
+
+        if group.active_count >= group.capacity:
             raise HTTPException(
                 status_code=409,
                 detail=f"Group '{group.name}' is at full capacity ({group.capacity} students). "
@@ -1565,14 +1430,20 @@ async def update_student(
     elif "group_id" in update_data and update_data["group_id"] is not None:
         # Just validate group exists if only changing group
         from app.models.domain import Group
-        group_result = await db.execute(select(Group).where(Group.id == update_data["group_id"]))
-        if not group_result.scalar_one_or_none():
+        if not await db.get(Group, update_data["group_id"]):
             raise HTTPException(status_code=404, detail=f"Group with ID {update_data['group_id']} not found")
 
     for field, value in update_data.items():
         setattr(student, field, value)
 
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if update_data.get("face_id") is None:
+            raise
+        # A concurrent request took the same face_id after the check above
+        raise HTTPException(status_code=400, detail="Face ID already exists. Please use a unique Face ID")
     await db.refresh(student)
     return DataResponse(data=StudentRead.model_validate(student))
 
@@ -1583,7 +1454,12 @@ async def get_student_contracts(
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
     from app.models.domain import Contract
-    result = await db.execute(select(Contract).where(Contract.student_id == student_id))
+    from sqlalchemy.orm import selectinload, raiseload
+    result = await db.execute(
+        select(Contract)
+        .options(selectinload(Contract.terminated_by), raiseload("*"))
+        .where(Contract.student_id == student_id)
+    )
     contracts = result.scalars().all()
     return DataResponse(data=[ContractRead.model_validate(c) for c in contracts])
 
@@ -1592,30 +1468,33 @@ async def get_student_contracts(
 async def get_student_transactions(
     student_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    page: Optional[int] = Query(None, ge=1, description="Page number (default 1 when page_size is given)"),
+    page_size: Optional[int] = Query(None, ge=1, le=500, description="Items per page (default 100 when page is given); omit both for the full history"),
 ):
-    result = await db.execute(select(Transaction).where(Transaction.student_id == student_id))
-    transactions = result.scalars().all()
-    return DataResponse(data=[TransactionRead.model_validate(t) for t in transactions])
+    rows, meta = await _student_history_page(db, Transaction, student_id, page, page_size)
+    return DataResponse(data=_transactions_adapter.validate_python(rows, from_attributes=True), meta=meta)
 
 
 @router.get("/{student_id}/attendance", response_model=DataResponse[list[AttendanceRead]], dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
 async def get_student_attendance(
     student_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    page: Optional[int] = Query(None, ge=1, description="Page number (default 1 when page_size is given)"),
+    page_size: Optional[int] = Query(None, ge=1, le=500, description="Items per page (default 100 when page is given); omit both for the full history"),
 ):
-    result = await db.execute(select(Attendance).where(Attendance.student_id == student_id))
-    attendance = result.scalars().all()
-    return DataResponse(data=[AttendanceRead.model_validate(a) for a in attendance])
+    rows, meta = await _student_history_page(db, Attendance, student_id, page, page_size)
+    return DataResponse(data=_attendances_adapter.validate_python(rows, from_attributes=True), meta=meta)
 
 
 @router.get("/{student_id}/gatelogs", response_model=DataResponse[list[GateLogRead]], dependencies=[Depends(require_permission(PERM_STUDENTS_VIEW))])
 async def get_student_gatelogs(
     student_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    page: Optional[int] = Query(None, ge=1, description="Page number (default 1 when page_size is given)"),
+    page_size: Optional[int] = Query(None, ge=1, le=500, description="Items per page (default 100 when page is given); omit both for the full history"),
 ):
-    result = await db.execute(select(GateLog).where(GateLog.student_id == student_id))
-    logs = result.scalars().all()
-    return DataResponse(data=[GateLogRead.model_validate(l) for l in logs])
+    rows, meta = await _student_history_page(db, GateLog, student_id, page, page_size)
+    return DataResponse(data=_gatelogs_adapter.validate_python(rows, from_attributes=True), meta=meta)
 
 
 @router.get("/attendances/all", response_model=DataResponse[list[AttendanceRead]], dependencies=[Depends(require_permission(PERM_ATTENDANCE_VIEW))])
@@ -1627,6 +1506,7 @@ async def get_all_attendances(
     student_id: Optional[int] = Query(None, description="Filter by student ID"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page; when set, page is ignored and meta has no total"),
 ):
     """
     Get all student attendances with filters.
@@ -1641,61 +1521,74 @@ async def get_all_attendances(
     - student_id: Filter by specific student
     - page: Page number for pagination
     - page_size: Number of records per page (max 100)
+    - cursor: next_cursor from the previous page (keyset pagination, faster for deep pages)
 
     Note: This is for viewing marked attendances (coach-created).
     Turnstile/gate attendance is handled separately.
     """
-    from sqlalchemy.orm import selectinload
-
-    # Build query for all attendances
-    attendance_query = select(Attendance).options(
-        selectinload(Attendance.student),
-        selectinload(Attendance.session).selectinload(Session.group),
-        selectinload(Attendance.marked_by)
-    )
-
-    # Apply date filters via session
-    if from_date or to_date:
-        attendance_query = attendance_query.join(Session)
-        if from_date:
-            attendance_query = attendance_query.where(Session.session_date >= from_date)
-        if to_date:
-            attendance_query = attendance_query.where(Session.session_date <= to_date)
-
-    # Apply group filter via session
+    from sqlalchemy.orm import raiseload
+
+    # Build query for all attendances. AttendanceRead only has column fields, so no
+    # relationships are loaded; raiseload makes an accidental lazy load fail loudly
+    attendance_query = select(Attendance).options(raiseload("*"))
+    conditions = []
+
+    # Apply date/group filters via session as one EXISTS (no join, index on sessions(group_id, session_date))
+    session_filters = []
+    if from_date:
+        session_filters.append(Session.session_date >= from_date)
+    if to_date:
+        session_filters.append(Session.session_date <= to_date)
     if group_id:
-        if not (from_date or to_date):  # Only join if not already joined
-            attendance_query = attendance_query.join(Session)
-        attendance_query = attendance_query.where(Session.group_id == group_id)
+        session_filters.append(Session.group_id == group_id)
+    if session_filters:
+        conditions.append(exists().where(Session.id == Attendance.session_id, *session_filters))
 
     # Apply student filter
     if student_id:
-        attendance_query = attendance_query.where(Attendance.student_id == student_id)
+        conditions.append(Attendance.student_id == student_id)
 
-    # Order by most recent first
-    attendance_query = attendance_query.order_by(Attendance.created_at.desc())
+    if conditions:
+        attendance_query = attendance_query.where(*conditions)
 
-    # Get total count for pagination
-    count_query = select(func.count()).select_from(attendance_query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    # Apply pagination: keyset after the cursor row, otherwise OFFSET
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        attendance_query = attendance_query.where(
+            tuple_(Attendance.created_at, Attendance.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    else:
+        # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
+        attendance_query = attendance_query.add_columns(func.count().over().label("total")).offset((page - 1) * page_size)
 
-    # Apply pagination
-    offset = (page - 1) * page_size
-    attendance_query = attendance_query.offset(offset).limit(page_size)
+    # Order by most recent first; one extra row tells whether there is a next page
+    attendance_query = attendance_query.order_by(Attendance.created_at.desc(), Attendance.id.desc()).limit(page_size + 1)
 
     # Execute query
     attendances_result = await db.execute(attendance_query)
-    attendances = attendances_result.scalars().all()
+    rows = attendances_result.all()
+    attendances, next_cursor = split_page([row[0] for row in rows], page_size)
+
+    if cursor is not None:
+        # Keyset pages skip the count: counting all filtered rows is what cursors avoid
+        meta = PaginationMeta.for_cursor(page_size, next_cursor)
+    else:
+        if rows:
+            total = rows[0].total
+        else:
+            # A page past the end has no rows to carry the window count.
+            # Plain count over the same filters: no subquery, ORDER BY or loader options
+            count_query = select(func.count(Attendance.id))
+            if conditions:
+                count_query = count_query.where(*conditions)
+
+            total_result = await db.execute(count_query)
+            total = total_result.scalar() or 0
+        meta = PaginationMeta.for_page(page, page_size, total, next_cursor=next_cursor)
 
     return DataResponse(
-        data=[AttendanceRead.model_validate(a) for a in attendances],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        data=_attendances_adapter.validate_python(attendances, from_attributes=True),
+        meta=meta,
     )
 
 
@@ -1708,14 +1601,17 @@ async def delete_student(
     Soft delete a student by setting their status to DELETED.
     The student is not actually removed from the database.
     """
-    result = await db.execute(select(Student).where(Student.id == student_id))
-    student = result.scalar_one_or_none()
-
-    if not student:
+    # Soft delete: set status to DELETED instead of actually deleting
+    result = await db.execute(
+        update(Student)
+        .where(Student.id == student_id)
+        .values(status=StudentStatus.DELETED)
+        .returning(Student.id)
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    # Soft delete: set status to DELETED instead of actually deleting
-    student.status = StudentStatus.DELETED
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={"message": "Student deleted successfully"})
@@ -1733,24 +1629,23 @@ async def bulk_delete_students(
     if not student_ids:
         raise HTTPException(status_code=400, detail="No student IDs provided")
 
-    deleted_count = 0
-    errors = []
-
-    for student_id in student_ids:
-        try:
-            result = await db.execute(select(Student).where(Student.id == student_id))
-            student = result.scalar_one_or_none()
-
-            if not student:
-                errors.append({"student_id": student_id, "error": "Student not found"})
-                continue
-
-            # Soft delete: set status to DELETED instead of actually deleting
-            student.status = StudentStatus.DELETED
-            deleted_count += 1
-        except Exception as e:
-            errors.append({"student_id": student_id, "error": str(e)})
+    # Soft delete: bitta UPDATE ... RETURNING bilan, topilmagan ID'lar xato sifatida qaytadi
+    result = await db.execute(
+        update(Student)
+        .where(Student.id.in_(student_ids))
+        .values(status=StudentStatus.DELETED)
+        .returning(Student.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars().all())
+    deleted_count = len(deleted_ids)
+    errors = [
+        {"student_id": student_id, "error": "Student not found"}
+        for student_id in student_ids
+        if student_id not in deleted_ids
+    ]
 
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={
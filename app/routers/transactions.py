@@ -2,8 +2,11 @@ from typing import Annotated, Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, tuple_, delete
+from sqlalchemy.orm import raiseload
+from pydantic import TypeAdapter
 from app.core.db import get_db
+from app.core.pagination import decode_cursor, split_page, estimated_table_count
 from app.core.permissions import (
     PERM_FINANCE_TRANSACTIONS_VIEW,
     PERM_FINANCE_UNASSIGNED_VIEW,
@@ -17,9 +20,13 @@ from app.schemas.transaction import TransactionRead, ManualTransactionCreate, Tr
 from app.schemas.common import DataResponse, PaginationMeta
 from app.deps import require_permission, CurrentUser
 from app.services.payment import create_manual_transaction, assign_transaction, cancel_transaction
+from app.services.debt import mark_debt_changed
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+# Validate a whole page of ORM rows in one call instead of model_validate per row
+_transactions_adapter = TypeAdapter(list[TransactionRead])
+
 
 @router.get("", response_model=DataResponse[list[TransactionRead]], dependencies=[Depends(require_permission(PERM_FINANCE_TRANSACTIONS_VIEW))])
 async def get_transactions(
@@ -32,6 +39,8 @@ async def get_transactions(
     student_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page; when set, page is ignored and meta has no total"),
+    exact_count: bool = Query(True, description="false: without filters, meta.total is the planner's estimate of the table size (no COUNT)"),
 ):
     """
     Get all transactions with optional filters.
@@ -39,8 +48,11 @@ async def get_transactions(
     Default behavior:
     - Shows all transactions from all years
     - Can filter by payment_year, date range, status, source, student
+
+    Transactions are ordered newest first. For deep pages prefer cursor over
+    page: OFFSET has to skip all earlier rows, cursor seeks straight to them.
     """
-    query = select(Transaction)
+    query = select(Transaction).options(raiseload("*"))
     conditions = []
 
     # Only filter by year if explicitly provided
@@ -61,28 +73,44 @@ async def get_transactions(
     if conditions:
         query = query.where(and_(*conditions))
 
-    # Order by most recent first
-    query = query.order_by(Transaction.created_at.desc())
-
-    offset = (page - 1) * page_size
-    result = await db.execute(query.offset(offset).limit(page_size))
-    transactions = result.scalars().all()
-
-    count_query = select(func.count(Transaction.id))
-    if conditions:
-        count_query = count_query.where(and_(*conditions))
-
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    total = None
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(cursor_created_at, cursor_id))
+    else:
+        # Unfiltered listing of the whole table: an estimate is enough when the client allows it
+        if not exact_count and not conditions:
+            total = await estimated_table_count(db, Transaction.__tablename__)
+        if total is None:
+            # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
+            query = query.add_columns(func.count().over().label("total"))
+        query = query.offset((page - 1) * page_size)
+
+    # Order by most recent first; one extra row tells whether there is a next page
+    query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    result = await db.execute(query.limit(page_size + 1))
+    rows = result.all()
+    transactions, next_cursor = split_page([row[0] for row in rows], page_size)
+
+    if cursor is not None:
+        # Keyset pages skip the count: counting all filtered rows is what cursors avoid
+        meta = PaginationMeta.for_cursor(page_size, next_cursor)
+    else:
+        if total is None and rows:
+            total = rows[0].total
+        elif total is None:
+            # A page past the end has no rows to carry the window count
+            count_query = select(func.count(Transaction.id))
+            if conditions:
+                count_query = count_query.where(and_(*conditions))
+
+            count_result = await db.execute(count_query)
+            total = count_result.scalar()
+        meta = PaginationMeta.for_page(page, page_size, total, next_cursor=next_cursor)
 
     return DataResponse(
-        data=[TransactionRead.model_validate(t) for t in transactions],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        data=_transactions_adapter.validate_python(transactions, from_attributes=True),
+        meta=meta,
     )
 
 
@@ -91,29 +119,39 @@ async def get_unassigned_transactions(
     db: Annotated[AsyncSession, Depends(get_db)],
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page; when set, page is ignored and meta has no total"),
 ):
-    offset = (page - 1) * page_size
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.status == PaymentStatus.UNASSIGNED)
-        .offset(offset)
-        .limit(page_size)
-    )
-    transactions = result.scalars().all()
+    query = select(Transaction).options(raiseload("*")).where(Transaction.status == PaymentStatus.UNASSIGNED)
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(cursor_created_at, cursor_id))
+    else:
+        # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
+        query = query.add_columns(func.count().over().label("total")).offset((page - 1) * page_size)
 
-    count_result = await db.execute(
-        select(func.count(Transaction.id)).where(Transaction.status == PaymentStatus.UNASSIGNED)
+    result = await db.execute(
+        query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(page_size + 1)
     )
-    total = count_result.scalar()
+    rows = result.all()
+    transactions, next_cursor = split_page([row[0] for row in rows], page_size)
+
+    if cursor is not None:
+        # Keyset pages skip the count: counting all filtered rows is what cursors avoid
+        meta = PaginationMeta.for_cursor(page_size, next_cursor)
+    else:
+        if rows:
+            total = rows[0].total
+        else:
+            # A page past the end has no rows to carry the window count
+            count_result = await db.execute(
+                select(func.count(Transaction.id)).where(Transaction.status == PaymentStatus.UNASSIGNED)
+            )
+            total = count_result.scalar()
+        meta = PaginationMeta.for_page(page, page_size, total, next_cursor=next_cursor)
 
     return DataResponse(
-        data=[TransactionRead.model_validate(t) for t in transactions],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        data=_transactions_adapter.validate_python(transactions, from_attributes=True),
+        meta=meta,
     )
 
 
@@ -174,13 +212,13 @@ async def delete_transaction(
     transaction_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(Transaction).where(Transaction.id == transaction_id))
-    transaction = result.scalar_one_or_none()
-
-    if not transaction:
+    result = await db.execute(
+        delete(Transaction).where(Transaction.id == transaction_id).returning(Transaction.id)
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
-    await db.delete(transaction)
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={"message": "Transaction deleted successfully"})
@@ -195,23 +233,21 @@ async def bulk_delete_transactions(
     if not transaction_ids:
         raise HTTPException(status_code=400, detail="No transaction IDs provided")
 
-    deleted_count = 0
-    errors = []
-
-    for transaction_id in transaction_ids:
-        try:
-            result = await db.execute(select(Transaction).where(Transaction.id == transaction_id))
-            transaction = result.scalar_one_or_none()
-
-            if not transaction:
-                errors.append({"transaction_id": transaction_id, "error": "Transaction not found"})
-                continue
-
-            await db.delete(transaction)
-            deleted_count += 1
-        except Exception as e:
-            errors.append({"transaction_id": transaction_id, "error": str(e)})
-
+    result = await db.execute(
+        delete(Transaction)
+        .where(Transaction.id.in_(transaction_ids))
+        .returning(Transaction.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars().all())
+    deleted_count = len(deleted_ids)
+    errors = [
+        {"transaction_id": transaction_id, "error": "Transaction not found"}
+        for transaction_id in transaction_ids
+        if transaction_id not in deleted_ids
+    ]
+
+    mark_debt_changed(db)
     await db.commit()
 
     return DataResponse(data={
@@ -1,12 +1,15 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, or_, literal, union_all
 from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
 from app.core.db import get_db
+from app.core.etag import make_etag, not_modified, set_etag
 from app.core.security import hash_password
 from app.core.permissions import PERM_USERS_MANAGE
-from app.models.auth import User, Role
+from app.models.auth import User, Role, user_role_association
+from app.models.enums import UserStatus
 from app.schemas.auth import UserRead, UserCreate, UserUpdate, UserRolesUpdate, UserWithRoles, CoachWithGroups
 from app.schemas.common import DataResponse, PaginationMeta
 from app.deps import require_permission, CurrentUser
@@ -14,6 +17,35 @@ from app.deps import require_permission, CurrentUser
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+async def _ensure_contacts_free(
+    db: AsyncSession,
+    phone: str | None,
+    email: str | None,
+    exclude_user_id: int | None = None,
+) -> None:
+    """
+    Raise 400 if phone or email (whichever is given) already belongs to another
+    user. Both are checked with one query; a phone clash is reported first.
+    """
+    conditions = []
+    if phone:
+        conditions.append(User.phone == phone)
+    if email:
+        conditions.append(User.email == email)
+    if not conditions:
+        return
+
+    query = select(User.phone, User.email).where(or_(*conditions))
+    if exclude_user_id is not None:
+        query = query.where(User.id != exclude_user_id)
+    taken = (await db.execute(query)).all()
+
+    if phone and any(row.phone == phone for row in taken):
+        raise HTTPException(status_code=400, detail="Phone already registered")
+    if email and any(row.email == email for row in taken):
+        raise HTTPException(status_code=400, detail="This email is already registered")
+
+
 @router.get("", response_model=DataResponse[list[UserWithRoles]], dependencies=[Depends(require_permission(PERM_USERS_MANAGE))])
 async def get_users(
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -21,62 +53,76 @@ async def get_users(
     page_size: int = Query(20, ge=1, le=100),
 ):
     offset = (page - 1) * page_size
+    # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
     result = await db.execute(
-        select(User)
+        select(User, func.count().over().label("total"))
         .options(selectinload(User.roles))
+        .order_by(User.id)
         .offset(offset)
         .limit(page_size)
     )
-    users = result.scalars().all()
+    rows = result.all()
+    users = [row[0] for row in rows]
 
-    count_result = await db.execute(select(func.count(User.id)))
-    total = count_result.scalar()
+    if rows:
+        total = rows[0].total
+    else:
+        # A page past the end has no rows to carry the window count
+        count_result = await db.execute(select(func.count(User.id)))
+        total = count_result.scalar()
 
     return DataResponse(
         data=[UserWithRoles.model_validate(u) for u in users],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=PaginationMeta.for_page(page, page_size, total),
     )
 
 
 @router.get("/coaches", response_model=DataResponse[list[CoachWithGroups]])
 async def get_coaches(
     user: CurrentUser,
+    request: Request,
+    response: Response,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    """Get all users with 'Coach' role and their assigned groups (requires authentication)"""
-    from app.models.enums import UserStatus
+    """
+    Get all users with 'Coach' role and their assigned groups (requires authentication).
+
+    Sends an ETag; a request with a matching If-None-Match gets 304.
+    """
     from app.models.domain import Group
     from app.schemas.group import GroupRead
 
-    # Find users who have the "Coach" role
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.roles))
-        .where(User.status == UserStatus.ACTIVE)
+    # Active users who have the "Coach" role (case-insensitive)
+    coach_filter = (
+        User.status == UserStatus.ACTIVE,
+        User.roles.any(func.lower(Role.name) == "coach"),
     )
-    all_users = result.scalars().all()
 
-    coaches_with_groups = []
-    for user_obj in all_users:
-        # Check if user has "Coach" role (case-insensitive)
-        has_coach_role = any(
-            role.name.lower() == "coach" for role in user_obj.roles
-        )
+    # ETag from the ids/updated_at of the coaches and their groups
+    fingerprint = await db.execute(
+        union_all(
+            select(literal("u").label("kind"), User.id, User.updated_at).where(*coach_filter),
+            select(literal("g").label("kind"), Group.id, Group.updated_at).where(
+                Group.coach_id.in_(select(User.id).where(*coach_filter))
+            ),
+        ).order_by("kind", "id")
+    )
+    etag = make_etag(*(tuple(row) for row in fingerprint))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
 
-        if not has_coach_role:
-            continue
+    result = await db.execute(select(User).where(*coach_filter))
+    coaches = result.scalars().all()
 
-        # Get groups assigned to this coach
-        groups_result = await db.execute(
-            select(Group).where(Group.coach_id == user_obj.id)
-        )
-        groups = groups_result.scalars().all()
+    # Groups of all coaches in one query instead of one per coach
+    groups_by_coach = {coach.id: [] for coach in coaches}
+    if groups_by_coach:
+        groups_result = await db.execute(select(Group).where(Group.coach_id.in_(groups_by_coach)))
+        for group in groups_result.scalars():
+            groups_by_coach[group.coach_id].append(group)
 
+    coaches_with_groups = []
+    for user_obj in coaches:
         coach_data = CoachWithGroups(
             id=user_obj.id,
             phone=user_obj.phone,
@@ -85,10 +131,11 @@ async def get_coaches(
             is_super_admin=user_obj.is_super_admin,
             status=user_obj.status,
             created_at=user_obj.created_at,
-            groups=[GroupRead.model_validate(g) for g in groups]
+            groups=[GroupRead.model_validate(g) for g in groups_by_coach[user_obj.id]]
         )
         coaches_with_groups.append(coach_data)
 
+    set_etag(response, etag)
     return DataResponse(data=coaches_with_groups)
 
 
@@ -97,26 +144,22 @@ async def create_user(
     data: UserCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    existing_phone = await db.execute(select(User).where(User.phone == data.phone))
-    if existing_phone.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Phone already registered")
+    await _ensure_contacts_free(db, data.phone, data.email)
 
-    if data.email:
-        existing_email = await db.execute(select(User).where(User.email == data.email))
-        if existing_email.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="This email is already registered")
+    # bcrypt is CPU-bound, hash in the threadpool so the event loop keeps serving other requests
+    hashed_password = await run_in_threadpool(hash_password, data.password)
 
     user = User(
         phone=data.phone,
         email=data.email,
         full_name=data.full_name,
-        hashed_password=hash_password(data.password),
+        hashed_password=hashed_password,
         is_super_admin=data.is_super_admin,
         status=data.status,
     )
     db.add(user)
+    # id and the server-side created_at come back with INSERT ... RETURNING, no refresh needed
     await db.commit()
-    await db.refresh(user)
 
     return DataResponse(data=UserRead.model_validate(user))
 
@@ -127,33 +170,33 @@ async def update_user(
     data: UserUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    await _ensure_contacts_free(db, data.phone, data.email, exclude_user_id=user_id)
 
+    values = {}
     if data.phone:
-        existing_phone = await db.execute(select(User).where(User.phone == data.phone, User.id != user_id))
-        if existing_phone.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Phone already registered")
-        user.phone = data.phone
-
+        values["phone"] = data.phone
     if data.email:
-        existing_email = await db.execute(select(User).where(User.email == data.email, User.id != user_id))
-        if existing_email.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="This email is already registered")
-        user.email = data.email
-
+        values["email"] = data.email
     if data.full_name:
-        user.full_name = data.full_name
+        values["full_name"] = data.full_name
     if data.password:
-        user.hashed_password = hash_password(data.password)
+        values["hashed_password"] = await run_in_threadpool(hash_password, data.password)
     if data.status:
-        user.status = data.status
+        values["status"] = data.status
+
+    if values:
+        # One UPDATE ... RETURNING both applies the changes and gives back the fresh row
+        result = await db.execute(
+            update(User).where(User.id == user_id).values(**values).returning(User)
+        )
+    else:
+        result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
     await db.commit()
-    await db.refresh(user)
 
     return DataResponse(data=UserRead.model_validate(user))
 
@@ -161,8 +204,26 @@ async def update_user(
 @router.get("/{user_id}", response_model=DataResponse[UserWithRoles], dependencies=[Depends(require_permission(PERM_USERS_MANAGE))])
 async def get_user(
     user_id: int,
+    request: Request,
+    response: Response,
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
+    """Get a user with roles. Sends an ETag; a request with a matching If-None-Match gets 304."""
+    # ETag from the user's and its roles' updated_at (role assignment changes the role ids)
+    fingerprint = (await db.execute(
+        select(User.updated_at, Role.id, Role.updated_at)
+        .outerjoin(user_role_association, user_role_association.c.user_id == User.id)
+        .outerjoin(Role, Role.id == user_role_association.c.role_id)
+        .where(User.id == user_id)
+        .order_by(Role.id)
+    )).all()
+    if not fingerprint:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    etag = make_etag(user_id, *(tuple(row) for row in fingerprint))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
     result = await db.execute(
         select(User).options(selectinload(User.roles)).where(User.id == user_id)
     )
@@ -171,6 +232,7 @@ async def get_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    set_etag(response, etag)
     return DataResponse(data=UserWithRoles.model_validate(user))
 
 
@@ -196,7 +258,6 @@ async def update_user_roles(
 
     user.roles = roles
     await db.commit()
-    await db.refresh(user, ["roles"])
 
     return DataResponse(data=UserWithRoles.model_validate(user))
 
@@ -240,27 +301,28 @@ async def bulk_delete_users(
     if not user_ids:
         raise HTTPException(status_code=400, detail="No user IDs provided")
 
-    deleted_count = 0
-    errors = []
-
-    for user_id in user_ids:
-        try:
-            result = await db.execute(select(User).where(User.id == user_id))
-            user = result.scalar_one_or_none()
-
-            if not user:
-                errors.append({"user_id": user_id, "error": "User not found"})
-                continue
-
-            if user.is_super_admin:
-                errors.append({"user_id": user_id, "error": "Cannot delete super admin user"})
-                continue
+    # Soft delete: set status to DELETED instead of actually deleting, in one UPDATE ... RETURNING
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), User.is_super_admin.is_(False))
+        .values(status=UserStatus.DELETED)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars().all())
+    deleted_count = len(deleted_ids)
 
-            # Soft delete: set status to DELETED instead of actually deleting
-            user.status = UserStatus.DELETED
-            deleted_count += 1
-        except Exception as e:
-            errors.append({"user_id": user_id, "error": str(e)})
+    errors = []
+    skipped_ids = [user_id for user_id in user_ids if user_id not in deleted_ids]
+    if skipped_ids:
+        # Tell super admins apart from IDs that don't exist
+        super_admin_ids = set((await db.execute(
+            select(User.id).where(User.id.in_(skipped_ids), User.is_super_admin.is_(True))
+        )).scalars().all())
+        errors = [
+            {"user_id": user_id, "error": "Cannot delete super admin user" if user_id in super_admin_ids else "User not found"}
+            for user_id in skipped_ids
+        ]
 
     await db.commit()
 
@@ -1,8 +1,11 @@
 from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, or_, and_, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.core.db import get_db
+from app.core.pagination import encode_queue_cursor, decode_queue_cursor
 from app.core.permissions import PERM_CONTRACTS_EDIT, PERM_CONTRACTS_VIEW
 from app.models.domain import WaitingList, Group
 from app.schemas.waiting_list import WaitingListCreate, WaitingListUpdate, WaitingListRead
@@ -20,6 +23,7 @@ async def get_waiting_list(
     birth_year: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="meta.next_cursor of the previous page; when set, page is ignored and meta has no total"),
 ):
     """
     Get waiting list entries for prospective students.
@@ -28,36 +32,58 @@ async def get_waiting_list(
     Filter by birth_year to see students of a specific birth year.
 
     Results are ordered by priority (high to low), then by created_at (oldest first).
+    For deep pages prefer cursor over page: OFFSET has to skip all earlier rows,
+    cursor seeks straight to them.
     """
-    query = select(WaitingList).order_by(WaitingList.priority.desc(), WaitingList.created_at)
-
-    if group_id:
-        query = query.where(WaitingList.group_id == group_id)
-    if birth_year:
-        query = query.where(WaitingList.birth_year == birth_year)
-
-    offset = (page - 1) * page_size
-    result = await db.execute(query.offset(offset).limit(page_size))
-    waiting_list = result.scalars().all()
-
-    # Count total
-    count_query = select(func.count(WaitingList.id))
+    conditions = []
     if group_id:
-        count_query = count_query.where(WaitingList.group_id == group_id)
+        conditions.append(WaitingList.group_id == group_id)
     if birth_year:
-        count_query = count_query.where(WaitingList.birth_year == birth_year)
-
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+        conditions.append(WaitingList.birth_year == birth_year)
+
+    query = select(WaitingList).where(*conditions)
+    if cursor is not None:
+        # Rows after the cursor in (priority DESC, created_at, id) order; the separate
+        # priority <= bound lets the queue index start the scan at the cursor's priority
+        cursor_priority, cursor_created_at, cursor_id = decode_queue_cursor(cursor)
+        query = query.where(WaitingList.priority <= cursor_priority, or_(
+            WaitingList.priority < cursor_priority,
+            and_(
+                WaitingList.priority == cursor_priority,
+                tuple_(WaitingList.created_at, WaitingList.id) > tuple_(cursor_created_at, cursor_id),
+            ),
+        ))
+    else:
+        # Total comes back on every row via a window count (evaluated before OFFSET/LIMIT)
+        query = query.add_columns(func.count().over().label("total")).offset((page - 1) * page_size)
+
+    # One extra row tells whether there is a next page
+    result = await db.execute(
+        query.order_by(WaitingList.priority.desc(), WaitingList.created_at, WaitingList.id).limit(page_size + 1)
+    )
+    rows = result.all()
+    waiting_list = [row[0] for row in rows[:page_size]]
+
+    next_cursor = None
+    if len(rows) > page_size:
+        last = waiting_list[-1]
+        next_cursor = encode_queue_cursor(last.priority, last.created_at, last.id)
+
+    if cursor is not None:
+        # Keyset pages skip the count: counting all filtered rows is what cursors avoid
+        meta = PaginationMeta.for_cursor(page_size, next_cursor)
+    else:
+        if rows:
+            total = rows[0].total
+        else:
+            # A page past the end has no rows to carry the window count
+            count_result = await db.execute(select(func.count(WaitingList.id)).where(*conditions))
+            total = count_result.scalar()
+        meta = PaginationMeta.for_page(page, page_size, total, next_cursor=next_cursor)
 
     return DataResponse(
         data=[WaitingListRead.model_validate(w) for w in waiting_list],
-        meta=PaginationMeta(
-            page=page,
-            page_size=page_size,
-            total=total,
-            total_pages=(total + page_size - 1) // page_size,
-        ),
+        meta=meta,
     )
 
 
@@ -73,61 +99,59 @@ async def add_to_waiting_list(
     Used when a group is full and a new student (not yet registered) needs to wait for a slot.
     Stores all student and parent information directly - no need to create a student record first.
     """
+    # Validate parent information - at least one parent contact is required
+    if not data.father_phone and not data.mother_phone:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one parent phone number (father or mother) is required"
+        )
+
     # Check if group exists
-    group_result = await db.execute(select(Group).where(Group.id == data.group_id))
-    group = group_result.scalar_one_or_none()
-    if not group:
+    group_birth_year = await db.scalar(select(Group.birth_year).where(Group.id == data.group_id))
+    if group_birth_year is None:
         raise HTTPException(status_code=404, detail=f"Group with ID {data.group_id} not found")
 
     # Validate birth year matches group's birth year
-    if group.birth_year != data.birth_year:
+    if group_birth_year != data.birth_year:
         raise HTTPException(
             status_code=400,
-            detail=f"Student birth year ({data.birth_year}) does not match group's birth year ({group.birth_year})"
+            detail=f"Student birth year ({data.birth_year}) does not match group's birth year ({group_birth_year})"
         )
 
-    # Check for duplicate entry (same name, birth year, and group)
-    existing = await db.execute(
-        select(WaitingList).where(
-            and_(
-                WaitingList.student_first_name == data.student_first_name,
-                WaitingList.student_last_name == data.student_last_name,
-                WaitingList.birth_year == data.birth_year,
-                WaitingList.group_id == data.group_id
-            )
+    # The unique (name, birth year, group) index does the duplicate check: no row is returned on conflict.
+    # RETURNING brings back id and created_at, so no refresh is needed.
+    result = await db.execute(
+        pg_insert(WaitingList).values(
+            student_first_name=data.student_first_name,
+            student_last_name=data.student_last_name,
+            birth_year=data.birth_year,
+            father_name=data.father_name,
+            father_phone=data.father_phone,
+            mother_name=data.mother_name,
+            mother_phone=data.mother_phone,
+            group_id=data.group_id,
+            priority=data.priority,
+            notes=data.notes,
+            added_by_user_id=user.id
         )
+        .on_conflict_do_nothing(index_elements=[
+            WaitingList.student_first_name,
+            WaitingList.student_last_name,
+            WaitingList.birth_year,
+            WaitingList.group_id,
+        ])
+        .returning(WaitingList)
     )
-    if existing.scalar_one_or_none():
+    waiting_entry = result.scalar_one_or_none()
+    if waiting_entry is None:
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Student {data.student_first_name} {data.student_last_name} (born {data.birth_year}) "
                    f"is already in the waiting list for this group"
         )
 
-    # Validate parent information - at least one parent contact is required
-    if not data.father_phone and not data.mother_phone:
-        raise HTTPException(
-            status_code=400,
-            detail="At least one parent phone number (father or mother) is required"
-        )
-
-    waiting_entry = WaitingList(
-        student_first_name=data.student_first_name,
-        student_last_name=data.student_last_name,
-        birth_year=data.birth_year,
-        father_name=data.father_name,
-        father_phone=data.father_phone,
-        mother_name=data.mother_name,
-        mother_phone=data.mother_phone,
-        group_id=data.group_id,
-        priority=data.priority,
-        notes=data.notes,
-        added_by_user_id=user.id
-    )
-
-    db.add(waiting_entry)
     await db.commit()
-    await db.refresh(waiting_entry)
 
     return DataResponse(data=WaitingListRead.model_validate(waiting_entry))
 
@@ -158,18 +182,37 @@ async def update_waiting_list_entry(
 
     Can update student info, parent info, priority, or notes.
     """
-    result = await db.execute(select(WaitingList).where(WaitingList.id == waiting_id))
+    update_data = data.model_dump(exclude_unset=True)
+
+    if update_data:
+        # One UPDATE ... RETURNING both applies the changes and gives back the fresh row
+        try:
+            result = await db.execute(
+                update(WaitingList).where(WaitingList.id == waiting_id).values(**update_data).returning(WaitingList)
+            )
+        except IntegrityError as e:
+            await db.rollback()
+            # Only a unique violation (ix_waiting_list_student_group) is a duplicate entry
+            if getattr(e.orig, "sqlstate", None) != "23505":
+                raise
+            current = (await db.execute(
+                select(WaitingList.student_first_name, WaitingList.student_last_name, WaitingList.birth_year)
+                .where(WaitingList.id == waiting_id)
+            )).one()
+            student = {**current._asdict(), **update_data}
+            raise HTTPException(
+                status_code=400,
+                detail=f"Student {student['student_first_name']} {student['student_last_name']} "
+                       f"(born {student['birth_year']}) is already in the waiting list for this group"
+            )
+    else:
+        result = await db.execute(select(WaitingList).where(WaitingList.id == waiting_id))
     waiting_entry = result.scalar_one_or_none()
 
     if not waiting_entry:
         raise HTTPException(status_code=404, detail="Waiting list entry not found")
 
-    update_data = data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(waiting_entry, field, value)
-
     await db.commit()
-    await db.refresh(waiting_entry)
 
     return DataResponse(data=WaitingListRead.model_validate(waiting_entry))
 
@@ -216,7 +259,7 @@ async def get_next_in_queue(
     result = await db.execute(
         select(WaitingList)
         .where(WaitingList.group_id == group_id)
-        .order_by(WaitingList.priority.desc(), WaitingList.created_at)
+        .order_by(WaitingList.priority.desc(), WaitingList.created_at, WaitingList.id)
         .limit(1)
     )
     next_entry = result.scalar_one_or_none()
@@ -6,10 +6,33 @@ T = TypeVar("T")
 
 
 class PaginationMeta(BaseModel):
-    page: int
+    page: Optional[int] = None  # None on cursor pages
     page_size: int
-    total: int
-    total_pages: int
+    total: Optional[int] = None  # None on cursor pages: keyset pagination does not count
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # keyset pagination: pass as ?cursor= for the next page
+
+    @classmethod
+    def for_page(cls, page: int, page_size: int, total: int, next_cursor: str | None = None) -> "PaginationMeta":
+        """Meta for one page of a list; values are computed by the endpoint, so validation is skipped."""
+        return cls.model_construct(
+            page=page,
+            page_size=page_size,
+            total=total,
+            total_pages=-(-total // page_size),
+            next_cursor=next_cursor,
+        )
+
+    @classmethod
+    def for_cursor(cls, page_size: int, next_cursor: str | None) -> "PaginationMeta":
+        """Meta for a keyset (cursor) page: only next_cursor, no page number or total."""
+        return cls.model_construct(
+            page=None,
+            page_size=page_size,
+            total=None,
+            total_pages=None,
+            next_cursor=next_cursor,
+        )
 
 
 class DataResponse(BaseModel, Generic[T]):
@@ -107,11 +107,12 @@ class ContractRead(BaseModel):
     form_086_url: Optional[str] = None
     heart_checkup_url: Optional[str] = None
     birth_certificate_url: Optional[str] = None
-    contract_images_urls: Optional[str] = None  # JSON string
+    contract_images_urls: Optional[List[Optional[str]]] = None
     final_pdf_url: Optional[str] = None
+    pdf_error: Optional[str] = None
 
     # Custom fields
-    custom_fields: Optional[str] = None  # JSON string
+    custom_fields: Optional[dict] = None
 
     # Termination
     terminated_at: Optional[datetime] = None
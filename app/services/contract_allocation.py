@@ -17,6 +17,10 @@ from app.models.domain import Contract, Group, Student
 from app.models.enums import ContractStatus
 from typing import Optional, List
 
+# Groups are looked up with db.get(): the same group is needed by several of these
+# helpers within one request, and after the first load it comes from the session's
+# identity map without another query.
+
 
 class ContractNumberAllocationError(Exception):
     """Raised when contract number allocation fails"""
@@ -49,8 +53,7 @@ async def get_available_contract_numbers(
         archive_year = datetime.now().year
 
     # Get group capacity
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         raise ContractNumberAllocationError(f"Group with ID {group_id} not found")
@@ -109,8 +112,7 @@ async def allocate_contract_number(
     birth_year = student.date_of_birth.year
 
     # Get group to get identifier
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         raise ContractNumberAllocationError(f"Group with ID {group_id} not found")
@@ -154,8 +156,7 @@ async def is_group_full(
         archive_year = datetime.now().year
 
     # Get group capacity
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         return True  # Treat non-existent group as full
@@ -224,8 +225,7 @@ async def validate_contract_number(
         archive_year = datetime.now().year
 
     # Get group to verify identifier
-    group_result = await db.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
 
     if not group:
         return False, f"Group {group_id} not found", None
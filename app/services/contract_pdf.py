@@ -0,0 +1,88 @@
+"""
+Background contract PDF rendering.
+
+Contract creation commits the contract and responds immediately; the PDF
+(contract text + scanned attachments) is rendered afterwards by this job,
+uploaded to S3 and stored on contract.final_pdf_url. Clients poll
+GET /contracts/{contract_id}/pdf, which returns 404 while rendering, redirects
+to the PDF once it exists and reports contract.pdf_error if the render failed.
+"""
+import logging
+import os
+import tempfile
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+from app.core.db import AsyncSessionLocal
+from app.core.s3 import upload_pdf_to_s3
+from app.models.domain import Contract
+from app.utils.contract_pdf import ContractPDFGenerator
+
+logger = logging.getLogger(__name__)
+
+
+def _remove_files(*paths: str | None) -> None:
+    for path in paths:
+        try:
+            if path and os.path.exists(path):
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+async def _save_pdf_error(contract_id: int, contract_number: str, error: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Contract)
+                .where(Contract.id == contract_id)
+                .values(pdf_error=error)
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to save PDF error for contract {contract_number} (id={contract_id}): {e}")
+
+
+async def render_contract_pdf(contract_id: int, contract_number: str, pdf_data: dict) -> None:
+    """
+    Generate the contract PDF, upload it to S3 and save its URL on the contract.
+
+    A failure is stored on contract.pdf_error so clients polling for the PDF
+    stop waiting; a later successful render clears it.
+
+    Runs after the HTTP response has been sent. reportlab rendering, the
+    S3 upload and temp file cleanup are blocking, so all of them are executed
+    in the threadpool to keep the event loop free.
+
+    Args:
+        contract_id: ID of the already committed contract
+        contract_number: Contract number (used in the S3 key)
+        pdf_data: Data for ContractPDFGenerator
+    """
+    temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    pdf_path = temp_pdf.name
+    temp_pdf.close()
+
+    final_pdf_path = None
+    try:
+        generator = ContractPDFGenerator(pdf_data)
+        final_pdf_path = await run_in_threadpool(generator.generate, pdf_path)
+
+        if not final_pdf_path or not isinstance(final_pdf_path, (str, os.PathLike)):
+            raise ValueError(f"PDF generation failed: {type(final_pdf_path)}")
+
+        pdf_s3_url = await run_in_threadpool(upload_pdf_to_s3, final_pdf_path, contract_number)
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Contract)
+                .where(Contract.id == contract_id)
+                .values(final_pdf_url=pdf_s3_url, pdf_error=None)
+            )
+            await db.commit()
+
+        logger.info(f"Contract {contract_number} PDF generated: {pdf_s3_url}")
+    except Exception as e:
+        logger.error(f"Failed to generate PDF for contract {contract_number} (id={contract_id}): {e}")
+        await _save_pdf_error(contract_id, contract_number, str(e) or type(e).__name__)
+    finally:
+        await run_in_threadpool(_remove_files, pdf_path, final_pdf_path)
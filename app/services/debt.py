@@ -1,10 +1,19 @@
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func, cast, values, column, Date, Integer, event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.core.cache import TTLCache
 from app.models.domain import Student, Contract
 from app.models.finance import Transaction
-from app.models.enums import ContractStatus, PaymentStatus
+from app.models.enums import ContractStatus, PaymentStatus, StudentStatus
+
+# /students/unpaid responses keyed by filter parameters.
+# Cleared whenever a committed session wrote students, contracts or transactions.
+unpaid_students_cache = TTLCache(ttl=120)
+
+_DEBT_MODELS = (Student, Contract, Transaction)
 
 
 async def calculate_student_debt(db: AsyncSession, student_id: int, as_of_date: date = None) -> float:
@@ -81,3 +90,124 @@ async def check_current_month_payment(db: AsyncSession, student_id: int) -> bool
 
     total_paid_this_month = sum(float(txn.amount) for txn in transactions)
     return total_paid_this_month >= float(contract.monthly_fee)
+
+
+def month_range(start: date, end: date) -> list[tuple[int, int]]:
+    """(year, month) for every calendar month from start to end, inclusive."""
+    start_key = start.year * 12 + start.month - 1
+    end_key = end.year * 12 + end.month - 1
+    return [(key // 12, key % 12 + 1) for key in range(start_key, end_key + 1)]
+
+
+def unpaid_students_query(target_months: list[tuple[int, int]], group_id: int | None = None) -> Select:
+    """
+    Build one aggregate query with debt totals for every active student.
+
+    For each (year, month) in target_months a contract contributes its
+    monthly_fee if the month falls between its start month and its end /
+    termination month. Paid amount is the sum of SUCCESS transactions whose
+    payment_year/payment_months cover the month.
+
+    Rows: student_id, total_expected, total_paid, debt_amount,
+    active_contracts_count - only students with debt > 0.01, highest debt first.
+
+    Everything is computed by PostgreSQL in this one statement; every
+    subquery is limited to the students in the expected CTE.
+    """
+    target = values(column("year", Integer), column("month", Integer), name="months").data(target_months)
+    months = select(
+        target.c.year,
+        target.c.month,
+        (target.c.year * 12 + target.c.month).label("month_key"),
+    ).cte("target_months")
+
+    start_key = func.extract("year", Contract.start_date) * 12 + func.extract("month", Contract.start_date)
+    effective_end = func.least(
+        Contract.end_date,
+        func.coalesce(cast(Contract.terminated_at, Date), Contract.end_date),
+    )
+    end_key = func.extract("year", effective_end) * 12 + func.extract("month", effective_end)
+
+    student_filters = [Student.status == StudentStatus.ACTIVE]
+    if group_id:
+        student_filters.append(Student.group_id == group_id)
+
+    expected = (
+        select(Contract.student_id, func.sum(Contract.monthly_fee).label("total_expected"))
+        .join(Student, Student.id == Contract.student_id)
+        .join(months, and_(start_key <= months.c.month_key, months.c.month_key <= end_key))
+        .where(*student_filters)
+        .group_by(Contract.student_id)
+        .cte("expected")
+    )
+
+    paid = (
+        select(Transaction.student_id, func.sum(Transaction.amount).label("total_paid"))
+        .join(
+            months,
+            and_(
+                Transaction.payment_year == months.c.year,
+                Transaction.payment_months.op("@>")(func.jsonb_build_array(months.c.month)),
+            ),
+        )
+        .where(
+            Transaction.status == PaymentStatus.SUCCESS,
+            Transaction.student_id.in_(select(expected.c.student_id)),
+        )
+        .group_by(Transaction.student_id)
+        .subquery("paid")
+    )
+
+    active = (
+        select(Contract.student_id, func.count().label("active_contracts_count"))
+        .where(
+            Contract.status == ContractStatus.ACTIVE,
+            Contract.student_id.in_(select(expected.c.student_id)),
+        )
+        .group_by(Contract.student_id)
+        .subquery("active")
+    )
+
+    total_paid = func.coalesce(paid.c.total_paid, 0)
+    debt_amount = expected.c.total_expected - total_paid
+
+    return (
+        select(
+            expected.c.student_id,
+            expected.c.total_expected,
+            total_paid.label("total_paid"),
+            debt_amount.label("debt_amount"),
+            func.coalesce(active.c.active_contracts_count, 0).label("active_contracts_count"),
+        )
+        .outerjoin(paid, paid.c.student_id == expected.c.student_id)
+        .outerjoin(active, active.c.student_id == expected.c.student_id)
+        .where(expected.c.total_expected > 0, debt_amount > 0.01)
+        .order_by(debt_amount.desc(), expected.c.student_id)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _track_debt_flush(session, flush_context):
+    if any(isinstance(obj, _DEBT_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["debt_changed"] = True
+
+
+def mark_debt_changed(session) -> None:
+    """
+    Clear the unpaid students cache when session commits.
+
+    Bulk update()/delete()/insert() statements bypass the flush, so endpoints
+    that run them on students, contracts or transactions call this explicitly.
+    """
+    session.info["debt_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_unpaid_cache(session):
+    if session.info.pop("debt_changed", False):
+        unpaid_students_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_debt_changed(session):
+    session.info.pop("debt_changed", None)
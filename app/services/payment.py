@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_
 from app.models.finance import Transaction
 from app.models.domain import Contract
 from app.models.enums import PaymentStatus, PaymentSource
@@ -12,8 +12,6 @@ async def create_manual_transaction(
     data: ManualTransactionCreate,
     user_id: int,
 ) -> Transaction:
-    from sqlalchemy.dialects.postgresql import JSONB
-    from sqlalchemy import cast, func
     from app.models.enums import ContractStatus, StudentStatus
     from app.models.domain import Student
 
@@ -63,26 +61,31 @@ async def create_manual_transaction(
         if termination_date < effective_end_date:
             effective_end_date = termination_date
 
-    # Check for duplicate payments - prevent paying for the same month twice
-    for month in data.payment_months:
-        # Cast payment_months to JSONB to avoid type mismatch
-        existing_payment = await db.execute(
-            select(Transaction).where(
-                Transaction.contract_id == contract.id,
-                Transaction.student_id == contract.student_id,
-                Transaction.status == PaymentStatus.SUCCESS,
-                Transaction.payment_year == data.payment_year,
-                cast(Transaction.payment_months, JSONB).op('@>')(cast([month], JSONB))
-            )
+    # Check for duplicate payments - prevent paying for the same month twice.
+    # One query for all requested months instead of one per month.
+    existing_payments = await db.execute(
+        select(Transaction.id, Transaction.payment_months)
+        .where(
+            Transaction.contract_id == contract.id,
+            Transaction.student_id == contract.student_id,
+            Transaction.status == PaymentStatus.SUCCESS,
+            Transaction.payment_year == data.payment_year,
+            or_(*(Transaction.payment_months.contains([month]) for month in data.payment_months)),
         )
-        existing = existing_payment.scalar_one_or_none()
+        .order_by(Transaction.id)
+    )
+    existing_by_month = {}
+    for existing_id, existing_months in existing_payments.all():
+        for month in existing_months:
+            existing_by_month.setdefault(month, existing_id)
 
-        if existing:
+    for month in data.payment_months:
+        if month in existing_by_month:
             month_name = date(data.payment_year, month, 1).strftime('%B')
             raise ValueError(
                 f"Payment for {month_name} {data.payment_year} already exists for this contract. "
                 f"Cannot add duplicate payment for the same month. "
-                f"Existing transaction ID: {existing.id}"
+                f"Existing transaction ID: {existing_by_month[month]}"
             )
 
     # Validate that payment months fall within contract period
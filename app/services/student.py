@@ -0,0 +1,23 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.models.domain import Student
+
+
+async def existing_face_ids(
+    db: AsyncSession,
+    face_ids: list[str],
+    exclude_student_id: int | None = None,
+) -> set[str]:
+    """
+    Return the face IDs from face_ids that already belong to a student,
+    in one IN query. Pass exclude_student_id to ignore the student being updated.
+    """
+    if not face_ids:
+        return set()
+
+    query = select(Student.face_id).where(Student.face_id.in_(face_ids))
+    if exclude_student_id is not None:
+        query = query.where(Student.id != exclude_student_id)
+
+    result = await db.execute(query)
+    return set(result.scalars().all())
@@ -18,6 +18,7 @@ from reportlab.lib.pagesizes import A4
 import tempfile
 from PIL import Image
 from io import BytesIO
+from functools import lru_cache
 
 # Try to find DejaVu fonts in common Linux locations
 # font_locations = [
@@ -152,6 +153,37 @@ styles.add(ParagraphStyle(
     spaceAfter=15
 ))
 
+styles.add(ParagraphStyle(
+    name='PlaceholderStyle',
+    fontSize=8,
+    alignment=TA_CENTER
+))
+
+styles.add(ParagraphStyle(
+    name='DirectorInfo',
+    parent=styles['NormalUz'],
+    fontSize=11,
+    alignment=TA_RIGHT,
+    leading=14
+))
+
+
+_THOUSANDS_SEP = str.maketrans({",": "\u00a0"})
+
+
+def format_amount(amount):
+    """Summani minglik xonalari bo'yicha ajratish: 600000 -> '600 000' (bo'linmas probel bilan)"""
+    return format(amount, ",.0f").translate(_THOUSANDS_SEP)
+
+
+@lru_cache(maxsize=None)
+def _load_image_bytes(path):
+    """Statik rasm faylini (logotip) bir marta o'qib, keshda saqlash"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
 
 class ContractPDFGenerator:
     """Platypus yordamida shartnoma yaratuvchi sinf"""
@@ -332,38 +364,19 @@ class ContractPDFGenerator:
                 elif os.path.exists(img_path):
                     left_block = RLImage(img_path, width=30 * mm, height=40 * mm)
                 else:
-                    left_block = Paragraph("[Rasm topilmadi]", ParagraphStyle(
-                        name='PlaceholderStyle',
-                        fontSize=8,
-                        alignment=TA_CENTER
-                    ))
+                    left_block = Paragraph("[Rasm topilmadi]", styles['PlaceholderStyle'])
             except Exception as e:
                 print(f"⚠️ Rasm yuklashda xato: {e}")
-                left_block = Paragraph("[Rasm yuklab bo'lmadi]", ParagraphStyle(
-                    name='PlaceholderStyle',
-                    fontSize=8,
-                    alignment=TA_CENTER
-                ))
+                left_block = Paragraph("[Rasm yuklab bo'lmadi]", styles['PlaceholderStyle'])
         else:
-            left_block = Paragraph("[Rasm yo'q]", ParagraphStyle(
-                name='PlaceholderStyle',
-                fontSize=8,
-                alignment=TA_CENTER
-            ))
-
-        right_style = ParagraphStyle(
-            name='DirectorInfo',
-            parent=styles['NormalUz'],
-            fontSize=11,
-            alignment=TA_RIGHT,
-            leading=14
-        )
+            left_block = Paragraph("[Rasm yo'q]", styles['PlaceholderStyle'])
+
         right_text = (
             "«BUNYODKOR» ФА<br/>"
             "Директорга<br/>"
             "<b>Ш.Н.Саидовга</b>"
         )
-        right_block = Paragraph(right_text, right_style)
+        right_block = Paragraph(right_text, styles['DirectorInfo'])
 
         top_table = Table(
             [[left_block, right_block]],
@@ -518,8 +531,9 @@ class ContractPDFGenerator:
 
     def _add_logo(self):
         """Logotipni (rasmni) hujjat tepasiga qo'shish"""
-        if os.path.exists(self.logo_filename):
-            logo = RLImage(self.logo_filename, width=15 * mm, height=15 * mm)
+        logo_bytes = _load_image_bytes(self.logo_filename)
+        if logo_bytes:
+            logo = RLImage(BytesIO(logo_bytes), width=15 * mm, height=15 * mm)
 
             logo.hAlign = 'CENTER'
 
@@ -894,57 +908,60 @@ class ContractPDFGenerator:
         # !!! Eslatma: bu yerda reportlab.platypus.Image ishlatilmaydi
 
         merger = PdfMerger()
-        merger.append(base_pdf)
-
         temp_files_to_delete = []
 
-        for url in image_urls:
-            try:
-                if url.startswith(('http://', 'https://')):
-                    with httpx.Client() as client:
-                        response = client.get(url, timeout=10.0)
-                        response.raise_for_status()
-                        img_data = BytesIO(response.content)
-                    img = PILImage.open(img_data).convert("RGB")
-
-                    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_img_file:
-                        img.save(temp_img_file.name, format="PNG")
-                        temp_img_path = temp_img_file.name
-                        temp_files_to_delete.append(temp_img_path)
-                else:
-                    img = PILImage.open(url).convert("RGB")
-                    temp_img_path = url
-
-                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_img_pdf:
-                    c = canvas.Canvas(temp_img_pdf.name, pagesize=A4)
-                    w, h = img.size
-                    aspect = h / w
-                    max_width = A4[0] - 30 * mm
-                    max_height = A4[1] - 30 * mm
-                    width = max_width
-                    height = width * aspect
-                    if height > max_height:
-                        height = max_height
-                        width = height / aspect
-                    x = (A4[0] - width) / 2
-                    y = (A4[1] - height) / 2
-                    c.drawImage(temp_img_path, x, y, width=width, height=height)
-                    c.showPage()
-                    c.save()
-                    merger.append(temp_img_pdf.name)
-                    temp_files_to_delete.append(temp_img_pdf.name)
-
-            except Exception as e:
-                print(f"!!! Attachmentni PDF ga qo'shishda xato: {url} -> {e}")
-
-        merger.write(output_pdf)
-        merger.close()
+        try:
+            merger.append(base_pdf)
 
-        for f in temp_files_to_delete:
-            try:
-                os.unlink(f)
-            except Exception:
-                pass
+            # Bitta client - barcha ilovalar uchun ulanish qayta ishlatiladi
+            with httpx.Client(timeout=10.0) as client:
+                for url in image_urls:
+                    try:
+                        if url.startswith(('http://', 'https://')):
+                            response = client.get(url)
+                            response.raise_for_status()
+                            img_data = BytesIO(response.content)
+                            img = PILImage.open(img_data).convert("RGB")
+
+                            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_img_file:
+                                img.save(temp_img_file.name, format="PNG")
+                                temp_img_path = temp_img_file.name
+                                temp_files_to_delete.append(temp_img_path)
+                        else:
+                            img = PILImage.open(url).convert("RGB")
+                            temp_img_path = url
+
+                        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_img_pdf:
+                            c = canvas.Canvas(temp_img_pdf.name, pagesize=A4)
+                            w, h = img.size
+                            aspect = h / w
+                            max_width = A4[0] - 30 * mm
+                            max_height = A4[1] - 30 * mm
+                            width = max_width
+                            height = width * aspect
+                            if height > max_height:
+                                height = max_height
+                                width = height / aspect
+                            x = (A4[0] - width) / 2
+                            y = (A4[1] - height) / 2
+                            c.drawImage(temp_img_path, x, y, width=width, height=height)
+                            c.showPage()
+                            c.save()
+                            merger.append(temp_img_pdf.name)
+                            temp_files_to_delete.append(temp_img_pdf.name)
+
+                    except Exception as e:
+                        print(f"!!! Attachmentni PDF ga qo'shishda xato: {url} -> {e}")
+
+            merger.write(output_pdf)
+        finally:
+            merger.close()
+
+            for f in temp_files_to_delete:
+                try:
+                    os.unlink(f)
+                except Exception:
+                    pass
 
     def generate(self, output_file):
 
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -27,6 +28,7 @@ from app.routers import (
 )
 from app.services.backup import backup_service
 from app.core.config import settings as app_settings
+from app.core.db import engine, warm_up_pool
 
 # Configure logging
 logging.basicConfig(
@@ -50,6 +52,8 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Bunyodkor CIMS API...")
 
+    await warm_up_pool(app_settings.DB_POOL_WARMUP)
+
     # Initialize backup scheduler if enabled
     if app_settings.BACKUP_ENABLED:
         logger.info(
@@ -91,12 +95,16 @@ async def lifespan(app: FastAPI):
         scheduler.shutdown()
         logger.info("Backup scheduler stopped")
 
+    await engine.dispose()
+
 
 app = FastAPI(
     title="BUNYODKOR CIMS API",
     description="Comprehensive management system for Bunyodkor Football Academy",
     version="1.0.0",
     lifespan=lifespan,
+    # Responses are encoded with orjson instead of the stdlib json module
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -59,6 +59,208 @@ END $$;
 -- Note: Students and contracts already have status columns
 -- The new enum values (archived) are handled in Python code
 
+-- Migration 005: Store contract documents/custom fields as JSONB
+-- ============================================
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'contracts' AND column_name = 'contract_images_urls' AND data_type = 'text'
+    ) THEN
+        ALTER TABLE contracts ALTER COLUMN contract_images_urls TYPE jsonb USING contract_images_urls::jsonb;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'contracts' AND column_name = 'custom_fields' AND data_type = 'text'
+    ) THEN
+        ALTER TABLE contracts ALTER COLUMN custom_fields TYPE jsonb USING custom_fields::jsonb;
+    END IF;
+END $$;
+
+
+-- Migration 006: JSONB payment_months + indexes for unpaid/debt lookups
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'transactions' AND column_name = 'payment_months' AND data_type = 'json'
+    ) THEN
+        ALTER TABLE transactions ALTER COLUMN payment_months TYPE jsonb USING payment_months::jsonb;
+    END IF;
+END $$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_student_year_status
+    ON transactions (student_id, payment_year, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_payment_months_gin
+    ON transactions USING gin (payment_months jsonb_path_ops)
+    WHERE status = 'SUCCESS';
+
+
+-- Migration 007: Trigram indexes for ILIKE '%q%' student search
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+-- Trigram lookups need at least 3 characters in the search term.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_first_name_trgm
+    ON students USING gin (first_name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_last_name_trgm
+    ON students USING gin (last_name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_phone_trgm
+    ON students USING gin (phone gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contracts_contract_number_trgm
+    ON contracts USING gin (contract_number gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_parents_email_trgm
+    ON parents USING gin (email gin_trgm_ops);
+
+
+-- Migration 008: Generated columns for prefix search on student name/phone
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+ALTER TABLE students ADD COLUMN IF NOT EXISTS first_name_lower text
+    GENERATED ALWAYS AS (lower(first_name)) STORED;
+ALTER TABLE students ADD COLUMN IF NOT EXISTS last_name_lower text
+    GENERATED ALWAYS AS (lower(last_name)) STORED;
+ALTER TABLE students ADD COLUMN IF NOT EXISTS phone_normalized text
+    GENERATED ALWAYS AS (regexp_replace(phone, '[^0-9]', '', 'g')) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_first_name_lower
+    ON students (first_name_lower text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_last_name_lower
+    ON students (last_name_lower text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_phone_normalized
+    ON students (phone_normalized text_pattern_ops);
+
+
+-- Migration 009: Covering index for per-contract paid sums
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_paid_lookup
+    ON transactions (student_id, contract_id, payment_year) INCLUDE (amount)
+    WHERE status = 'SUCCESS';
+
+
+-- Migration 010: (created_at, id) indexes for newest-first keyset pagination
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_created_at_id
+    ON transactions (created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_attendances_created_at_id
+    ON attendances (created_at, id);
+
+
+-- Migration 011: Indexes for filtered newest-first transaction/attendance lists
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_year_created_at
+    ON transactions (payment_year, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_student_created_at
+    ON transactions (student_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_unassigned_created_at
+    ON transactions (created_at, id)
+    WHERE status = 'UNASSIGNED';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_attendances_student_created_at
+    ON attendances (student_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_attendances_session_id
+    ON attendances (session_id);
+
+
+-- Migration 012: Sessions by group and date (attendance filters)
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sessions_group_id_session_date
+    ON sessions (group_id, session_date);
+
+
+-- Migration 013: Partial index for the default (non-archived) student list
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_students_year_not_archived
+    ON students (archive_year, id)
+    WHERE status <> 'ARCHIVED';
+
+
+-- Migration 014: Per-student gate log history, newest first
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_gate_logs_student_created_at
+    ON gate_logs (student_id, created_at, id);
+
+
+-- Migration 015: Index on groups.coach_id (coach lookups, coach group lists)
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_groups_coach_id
+    ON groups (coach_id);
+
+
+-- Migration 016: Unique waiting list entry per student (name + birth year) and group
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+-- The index cannot be built while duplicates exist; list them first with:
+--   SELECT student_first_name, student_last_name, birth_year, group_id, array_agg(id)
+--   FROM waiting_list GROUP BY 1, 2, 3, 4 HAVING count(*) > 1;
+-- If the build fails, DROP INDEX ix_waiting_list_student_group (left INVALID), fix the rows and rerun.
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_waiting_list_student_group
+    ON waiting_list (student_first_name, student_last_name, birth_year, group_id);
+
+
+-- Migration 017: Waiting list queue order (priority DESC, created_at, id)
+-- ============================================
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- run this section with psql in autocommit mode.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_waiting_list_group_queue
+    ON waiting_list (group_id, priority DESC, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_waiting_list_queue
+    ON waiting_list (priority DESC, created_at, id);
+
+
+-- Migration 018: Background contract PDF render failure
+-- ============================================
+
+ALTER TABLE contracts ADD COLUMN IF NOT EXISTS pdf_error TEXT;
+
+
 -- Verify changes
 SELECT 'Migration complete!' AS status;
 SELECT